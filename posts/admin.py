@@ -1,5 +1,10 @@
 from django.contrib import admin
 from .models import Post, Group, Comment, Follow
+from .search import fts_available, matching_ids
+
+
+# Сколько лучших совпадений полнотекстового поиска показывать в админке.
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -8,6 +13,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице ищем по FTS-индексу.
+        if not search_term or not fts_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        ids = [pk for pk, _ in matching_ids(
+            search_term, limit=ADMIN_SEARCH_LIMIT)]
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -0,0 +1,183 @@
+"""
+JSON API только для чтения поверх тех же лент, что и HTML-страницы.
+
+Строки берутся через values() без создания моделей и сериализуются по
+одной прямо в StreamingHttpResponse. Листаются курсором `?cursor=`,
+размер страницы — `?limit=` (не больше MAX_LIMIT), нужные поля —
+`?fields=id,text,author`. Ответ: {"results": [...], "next": курсор}.
+"""
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from . import timeline
+from .models import Group, Post, User
+from .pagination import (
+    COMMENT_ORDERING, CursorPaginator, encode_cursor, InvalidCursor,
+    PAGE_SIZE, POST_ORDERING,
+)
+
+
+MAX_LIMIT = 100
+
+# Имя поля в ответе → выражение для values().
+POST_FIELDS = {
+    'id': F('id'),
+    'text': F('text'),
+    'pub_date': F('pub_date'),
+    'author': F('author__username'),
+    'group': F('group__slug'),
+    'image': F('image'),
+    'comment_count': F('comment_count'),
+}
+COMMENT_FIELDS = {
+    'id': F('id'),
+    'text': F('text'),
+    'created': F('created'),
+    'author': F('author__username'),
+}
+
+
+def _image_url(name):
+    return Post._meta.get_field('image').storage.url(name) if name else None
+
+
+# Поля, которые отдаются не так, как лежат в БД.
+CONVERTERS = {'image': _image_url}
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(message, status):
+    return JsonResponse({'detail': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(view):
+    """Ошибки разбора параметров и 404 — в виде JSON, а не HTML."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _error('Метод не поддерживается', 405)
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return _error(str(e), 400)
+        except Http404:
+            return _error('Не найдено', 404)
+    return wrapper
+
+
+def _selected(request, available):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    names = [name for name in fields.split(',') if name]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return names
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _rows(queryset, available, names, ordering):
+    # Поля курсора нужны всегда, даже если клиент их не просил.
+    cursor_fields = [name.lstrip('-') for name in ordering]
+    # Аннотации с префиксом, чтобы не конфликтовать с полями модели.
+    expressions = {f'_{name}': available[name] for name in names}
+    return queryset.values(*cursor_fields, **expressions)
+
+
+def _serialize(row, names):
+    result = {}
+    for name in names:
+        value = row[f'_{name}']
+        convert = CONVERTERS.get(name)
+        result[name] = convert(value) if convert else value
+    return result
+
+
+def _stream(rows, names, limit, ordering):
+    yield '{"results":['
+    next_cursor = None
+    last = None
+    for position, row in enumerate(rows[:limit + 1].iterator()):
+        if position == limit:
+            next_cursor = encode_cursor(last, ordering)
+            break
+        if position:
+            yield ','
+        yield encoder.encode(_serialize(row, names))
+        last = row
+    yield f'],"next":{encoder.encode(next_cursor)}}}'
+
+
+def _listing(request, queryset, available=POST_FIELDS,
+             ordering=POST_ORDERING):
+    names = _selected(request, available)
+    limit = _limit(request)
+    try:
+        queryset = CursorPaginator(queryset, limit, ordering).rows_after(
+            request.GET.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest('Неверный курсор')
+    rows = _rows(queryset, available, names, ordering)
+    return StreamingHttpResponse(
+        _stream(rows, names, limit, ordering),
+        content_type='application/json')
+
+
+@api_view
+def index(request):
+    return _listing(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _listing(request, Post.objects.filter(group=group))
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return _listing(request, Post.objects.filter(author=author))
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация', 401)
+    return _listing(request, timeline.timeline_posts(request.user))
+
+
+@api_view
+def post_view(request, post_id):
+    names = _selected(request, POST_FIELDS)
+    row = _rows(Post.objects.filter(pk=post_id), POST_FIELDS, names,
+                POST_ORDERING).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(
+        _serialize(row, names), json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    return _listing(request, post.comments.all(), COMMENT_FIELDS,
+                    COMMENT_ORDERING)
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import api
+
+
+urlpatterns = [
+    path('posts/', api.index, name='api_index'),
+    path('posts/<int:post_id>/', api.post_view, name='api_post'),
+    path('posts/<int:post_id>/comments/', api.post_comments,
+         name='api_post_comments'),
+    path('group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('follow/', api.follow_index, name='api_follow_index'),
+    path('users/<username>/posts/', api.profile, name='api_profile'),
+]
@@ -0,0 +1,167 @@
+"""
+Замер пропускной способности SQLite при одновременных читателях и писателях.
+
+Читатели листают главную ленту тем же SQL, что и view, писатели добавляют
+посты с обновлением счётчика автора в одной транзакции. Каждый режим
+гоняется на свежей копии базы (sqlite3 backup API) во временном каталоге,
+рабочий файл не меняется.
+
+Режим `before` — SQLite по умолчанию (журнал DELETE, synchronous=FULL) и
+новое соединение на каждую операцию, как без CONN_MAX_AGE. Режим `after` —
+прагмы из yatube.sqlite и постоянные соединения.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+from yatube.sqlite import apply_pragmas, pragmas
+
+from .models import Post, User, UserStats
+from .pagination import PAGE_SIZE, POST_ORDERING
+
+
+MODES = {
+    'before': (lambda: {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+               False),
+    'after': (pragmas, True),
+}
+
+PAGES = 20
+
+
+def _copy_database(path):
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    connection.connection.backup(target)
+    target.close()
+
+
+def _feed_queries():
+    feed = Post.objects.feed().order_by(*POST_ORDERING)
+    queries = []
+    for page in range(PAGES):
+        sql, params = feed[
+            page * PAGE_SIZE:(page + 1) * PAGE_SIZE].query.sql_with_params()
+        # Django подставляет параметры как %s, модуль sqlite3 ждёт ?.
+        queries.append((sql % (('?',) * len(params)), params))
+    return queries
+
+
+def _write_sql():
+    post = Post._meta
+    columns = [post.get_field(name).column for name in (
+        'text', 'pub_date', 'modified', 'author', 'image', 'comment_count')]
+    stats = UserStats._meta
+    return (
+        f'INSERT INTO {post.db_table} ({", ".join(columns)}) '
+        f'VALUES (?, ?, ?, ?, \'\', 0)',
+        f'UPDATE {stats.db_table} SET '
+        f'{stats.get_field("posts_count").column} = '
+        f'{stats.get_field("posts_count").column} + 1 '
+        f'WHERE {stats.get_field("user").column} = ?',
+    )
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class _Worker(threading.Thread):
+
+    def __init__(self, path, values, persistent, deadline, operation):
+        super().__init__(daemon=True)
+        self.path = path
+        self.values = values
+        self.persistent = persistent
+        self.deadline = deadline
+        self.operation = operation
+        self.rnd = random.Random()
+        self.done = 0
+        self.errors = 0
+        self.latencies = []
+
+    def _connect(self):
+        # busy_timeout задаётся прагмой; у «before» остаётся ожидание
+        # модуля sqlite3 по умолчанию, как у Django.
+        db = sqlite3.connect(self.path, isolation_level=None,
+                             check_same_thread=False)
+        apply_pragmas(db, self.values)
+        return db
+
+    def run(self):
+        db = self._connect() if self.persistent else None
+        while time.monotonic() < self.deadline:
+            started = time.monotonic()
+            current = db or self._connect()
+            try:
+                self.operation(current, self.rnd)
+                self.done += 1
+                self.latencies.append(time.monotonic() - started)
+            except sqlite3.OperationalError:
+                self.errors += 1
+            finally:
+                if not self.persistent:
+                    current.close()
+        if db is not None:
+            db.close()
+
+
+def run(readers=4, writers=1, seconds=5.0):
+    """{режим: {'reads': в секунду, 'writes': в секунду, ...}}."""
+    authors = list(User.objects.values_list('pk', flat=True)[:1000])
+    if not authors:
+        raise ValueError('В базе нет пользователей, нечего замерять')
+    feed = _feed_queries()
+    insert_post, count_post = _write_sql()
+
+    def read(db, rnd):
+        sql, params = rnd.choice(feed)
+        db.execute(sql, params).fetchall()
+
+    def write(db, rnd):
+        author_id = rnd.choice(authors)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        db.execute('BEGIN')
+        try:
+            db.execute(insert_post, ('Замер', now, now, author_id))
+            db.execute(count_post, (author_id,))
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            db.execute('ROLLBACK')
+            raise
+
+    results = {}
+    for mode, (values, persistent) in MODES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            _copy_database(path)
+            deadline = time.monotonic() + seconds
+            workers = (
+                [_Worker(path, values(), persistent, deadline, read)
+                 for _ in range(readers)]
+                + [_Worker(path, values(), persistent, deadline, write)
+                   for _ in range(writers)])
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        reading, writing = workers[:readers], workers[readers:]
+        results[mode] = {
+            'reads': sum(w.done for w in reading) / seconds,
+            'writes': sum(w.done for w in writing) / seconds,
+            'errors': sum(w.errors for w in workers),
+            'read_p95': _percentile(
+                [t for w in reading for t in w.latencies], 0.95),
+            'write_p95': _percentile(
+                [t for w in writing for t in w.latencies], 0.95),
+        }
+    return results
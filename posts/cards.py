@@ -0,0 +1,86 @@
+"""
+Кеш карточек постов — HTML из posts/post_item.html.
+
+Один и тот же пост показывается на главной, в группе, в профиле и в
+ленте подписок, и каждый раз карточка собирается заново. Здесь она
+кешируется под ключом из id поста и Post.modified: правка поста и
+комментарий двигают modified, смена имени автора, правка группы и
+готовая миниатюра — тоже (refresh()), так что устаревшая карточка
+просто перестаёт читаться.
+
+Автор видит у своих постов кнопку «Редактировать», поэтому его вариант
+карточки лежит отдельно. Карточка с заглушкой вместо ещё не собранной
+миниатюры не кешируется.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import feed_cache, page_cache
+from .thumbnails import resolve_thumbnails
+
+
+CARD_CACHE_TIMEOUT = getattr(settings, 'CARD_CACHE_TIMEOUT', 24 * 60 * 60)
+
+TEMPLATE = 'posts/post_item.html'
+SIZE = 'card'
+
+
+def _is_own(post, user):
+    return user is not None and user.is_authenticated and (
+        post.author_id == user.pk)
+
+
+def card_key(post, own=False):
+    key = f'card:{post.pk}:{post.modified.timestamp()}'
+    return f'{key}:own' if own else key
+
+
+def _cacheable(post):
+    return not post.image or post.thumbnails.get(SIZE) is not None
+
+
+def render_cards(posts, user=None):
+    """HTML карточек по порядку; готовые берутся одним get_many."""
+    posts = list(posts)
+    keys = [card_key(post, _is_own(post, user)) for post in posts]
+    found = cache.get_many(keys)
+    missing = [post for post, key in zip(posts, keys) if key not in found]
+    resolve_thumbnails(missing, SIZE)
+    fresh = {}
+    for post, key in zip(posts, keys):
+        if key in found:
+            continue
+        found[key] = render_to_string(TEMPLATE, {'post': post, 'user': user})
+        if _cacheable(post):
+            fresh[key] = found[key]
+    if fresh:
+        cache.set_many(fresh, CARD_CACHE_TIMEOUT)
+    return mark_safe(''.join(found[key] for key in keys))
+
+
+def touch(posts):
+    """Новые ключи карточкам постов из queryset, когда их HTML устарел."""
+    return posts.update(modified=timezone.now())
+
+
+def refresh(posts, old_usernames=(), old_slugs=()):
+    """
+    Карточки постов из queryset устарели не из-за записи самих постов
+    (имя автора, группа, миниатюра): у постов новые ключи карточек, а
+    ленты и страницы, где они показаны, сброшены.
+    """
+    shown = set(posts.values_list(
+        'author_id', 'author__username', 'group__slug').distinct())
+    if not shown and not old_usernames and not old_slugs:
+        return
+    touch(posts)
+    for author_id, _, slug in shown:
+        feed_cache.bump_post_feeds(author_id, [slug])
+    page_cache.purge(reverse('index'))
+    page_cache.purge_profiles(
+        *old_usernames, *{username for _, username, _ in shown})
+    page_cache.purge_groups(*old_slugs, *{slug for _, _, slug in shown})
@@ -0,0 +1,60 @@
+"""
+Валидаторы для условных GET-запросов.
+
+ETag лент строится из того же ключа, что и кеш фрагментов: версии ленты,
+страницы и зрителя, поэтому проверка не трогает таблицу постов. Для
+профиля и поста к нему добавляются счётчики автора и версия подписок
+зрителя (от неё зависит кнопка «Подписаться»), для поста — ещё и время
+изменения поста, которое сдвигают правки и комментарии. Last-Modified
+не отдаётся: по одному времени поста нельзя понять, что сменился зритель
+или счётчики автора.
+"""
+from . import feed_cache
+from .models import Post, User
+
+
+STATS_FIELDS = (
+    'stats__posts_count', 'stats__followers_count', 'stats__following_count',
+)
+
+
+def _viewer_follows(request):
+    if not request.user.is_authenticated:
+        return ''
+    return feed_cache.feed_version(feed_cache.FOLLOW, request.user.pk)
+
+
+def _author(username):
+    return User.objects.filter(username=username).values(
+        'pk', *STATS_FIELDS).first()
+
+
+def _stats_tag(author):
+    return '.'.join(str(author[field]) for field in STATS_FIELDS)
+
+
+def index_etag(request):
+    return feed_cache.feed_cache_key(request, feed_cache.INDEX)
+
+
+def group_etag(request, slug):
+    return feed_cache.feed_cache_key(request, feed_cache.GROUP, slug)
+
+
+def profile_etag(request, username):
+    author = _author(username)
+    if author is None:
+        return None
+    key = feed_cache.feed_cache_key(request, feed_cache.AUTHOR, author['pk'])
+    return f'{key}:{_stats_tag(author)}:{_viewer_follows(request)}'
+
+
+def post_etag(request, username, post_id):
+    modified = Post.objects.filter(pk=post_id).values_list(
+        'modified', flat=True).first()
+    author = _author(username)
+    if modified is None or author is None:
+        return None
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    return (f'post:{post_id}:{modified.timestamp()}:{_stats_tag(author)}:'
+            f'{viewer}:{_viewer_follows(request)}')
@@ -0,0 +1,106 @@
+"""
+Денормализованные счётчики: комментарии поста, статистика пользователя и
+ссылки постов на файлы картинок.
+
+Счётчики меняются атомарными UPDATE ... SET n = n + 1 из сигналов, в
+одной транзакции с записью (AtomicSaveModel), уменьшение — не ниже нуля.
+`manage.py recount_counters` пересчитывает их целиком и чинит расхождения.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, StoredImage, User, UserStats
+
+
+def _count(queryset, field, outer='pk'):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def _user_counts(outer='pk'):
+    return {
+        'posts_count': _count(Post.objects.all(), 'author', outer),
+        'followers_count': _count(Follow.objects.all(), 'author', outer),
+        'following_count': _count(Follow.objects.all(), 'user', outer),
+    }
+
+
+def _create_stats(user_id):
+    counts = User.objects.filter(pk=user_id).values(**_user_counts()).first()
+    if counts is None:
+        return None
+    try:
+        with transaction.atomic():
+            return UserStats.objects.create(user_id=user_id, **counts)
+    except IntegrityError:
+        return UserStats.objects.get(user_id=user_id)
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return _create_stats(user.pk)
+
+
+def _shifted(field, delta):
+    # Уменьшение не уводит счётчик ниже нуля, даже если он уже разошёлся.
+    return F(field) + delta if delta >= 0 else Greatest(F(field) + delta, 0)
+
+
+def change_stats(user_id, **deltas):
+    """
+    Сдвигает счётчики пользователя. Если строки статистики ещё нет,
+    она считается с нуля — в ней уже будет учтено текущее изменение.
+    Уменьшение строку не создаёт: так удаление пользователя каскадом не
+    воскрешает его статистику.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(**{
+        field: _shifted(field, delta) for field, delta in deltas.items()
+    })
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        _create_stats(user_id)
+
+
+def change_comment_count(post_id, delta):
+    # Тем же UPDATE сдвигаем время изменения: страница поста поменялась.
+    Post.objects.filter(pk=post_id).update(
+        comment_count=_shifted('comment_count', delta),
+        modified=timezone.now())
+
+
+def recount():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    comment_count = _count(Comment.objects.all(), 'post')
+    fixed_posts = Post.objects.exclude(
+        comment_count=comment_count).update(comment_count=comment_count)
+
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True)
+    UserStats.objects.bulk_create(
+        # Размер пачки выбирает Django: на SQLite у однополевой вставки
+        # предел в 500 строк.
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        ignore_conflicts=True,
+    )
+
+    fixed_users = 0
+    for field, value in _user_counts(outer='user_id').items():
+        fixed_users += UserStats.objects.exclude(
+            **{field: value}).update(**{field: value})
+
+    images = Post.objects.filter(image__startswith='posts/').values_list(
+        'image', flat=True).distinct()
+    StoredImage.objects.bulk_create(
+        (StoredImage(name=name) for name in images.iterator()),
+        ignore_conflicts=True,
+    )
+    refs = _count(Post.objects.all(), 'image', outer='name')
+    fixed_images = StoredImage.objects.exclude(refs=refs).update(refs=refs)
+    return {'posts': fixed_posts, 'users': fixed_users,
+            'images': fixed_images}
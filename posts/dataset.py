@@ -0,0 +1,222 @@
+"""
+Синтетические данные для нагрузочного тестирования.
+
+Распределения похожи на живой сайт: число подписчиков автора и активность
+авторов подчиняются степенному закону (random.paretovariate), несколько
+«горячих» групп собирают большую часть постов (закон Ципфа), обсуждения
+сосредоточены на немногих постах. Картинки берутся из небольшого пула
+сгенерированных файлов, как мемы, которые постят снова и снова.
+
+Все строки вставляются bulk_create пачками с заранее известными id, так
+что ничего не приходится перечитывать из базы; одинаковый seed даёт
+одинаковые данные. Производные таблицы собираются после вставки.
+"""
+import bisect
+import itertools
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from . import thumbnails, transfer
+from .models import Comment, Follow, Group, Post, User
+
+
+DEFAULTS = {
+    'users': 1000,
+    'groups': 20,
+    'posts': 10000,
+    'comments': 30000,
+    'follows_per_user': 20,
+    'images': 20,
+    'image_share': 0.3,
+    'days': 365,
+    'seed': 42,
+    'batch_size': 5000,
+}
+
+# Показатели степенных законов: меньше — длиннее хвост.
+FOLLOWER_ALPHA = 1.2
+ACTIVITY_ALPHA = 1.5
+DISCUSSION_ALPHA = 1.1
+GROUP_ZIPF = 1.1
+
+PASSWORD = 'load-test'
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def _pick(rnd, cum_weights):
+    """Индекс по накопленным весам за O(log n)."""
+    return bisect.bisect(cum_weights, rnd.random() * cum_weights[-1])
+
+
+class Generator:
+
+    def __init__(self, progress=None, **options):
+        self.options = {**DEFAULTS, **options}
+        self.rnd = random.Random(self.options['seed'])
+        self.progress = progress
+        self.counts = {}
+        self.started = time.monotonic()
+
+    def _insert(self, model, objects):
+        batch_size = self.options['batch_size']
+        label = model._meta.label_lower
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, batch_size))
+            if not batch:
+                break
+            with transfer.original_dates(model), transaction.atomic():
+                model.objects.bulk_create(batch)
+            self.counts[label] = self.counts.get(label, 0) + len(batch)
+            if self.progress:
+                self.progress(sum(self.counts.values()),
+                              time.monotonic() - self.started)
+
+    def _users(self):
+        count = self.options['users']
+        first = _next_id(User)
+        password = make_password(PASSWORD)
+        # Суффикс с seed не даёт повторному запуску упереться в
+        # уникальность имён.
+        prefix = f'load{self.options["seed"]}_{first}_'
+        self._insert(User, (
+            User(pk=first + i, username=f'{prefix}{i}', password=password)
+            for i in range(count)
+        ))
+        return list(range(first, first + count))
+
+    def _groups(self):
+        first = _next_id(Group)
+        prefix = f'load-{self.options["seed"]}-{first}'
+        self._insert(Group, (
+            Group(pk=first + i, title=f'Группа {i}', slug=f'{prefix}-{i}',
+                  description=f'Сгенерированная группа {i}')
+            for i in range(self.options['groups'])
+        ))
+        return list(range(first, first + self.options['groups']))
+
+    def _image_pool(self):
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for i in range(self.options['images']):
+            image = Image.new('RGB', (1200, 800), self._color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = self.rnd.randrange(1200), self.rnd.randrange(800)
+                size = self.rnd.randrange(40, 400)
+                draw.ellipse((x, y, x + size, y + size), fill=self._color())
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            names.append(storage.save(f'posts/load{i}.jpg',
+                                      ContentFile(buffer.getvalue())))
+        return names
+
+    def _color(self):
+        return tuple(self.rnd.randrange(256) for _ in range(3))
+
+    def _posts(self, users, groups, images):
+        rnd = self.rnd
+        count = self.options['posts']
+        first = _next_id(Post)
+        now = timezone.now()
+        span = timedelta(days=self.options['days']).total_seconds()
+        authors = _cumulative(
+            rnd.paretovariate(ACTIVITY_ALPHA) for _ in users)
+        group_weights = _cumulative(
+            1 / (rank ** GROUP_ZIPF) for rank in range(1, len(groups) + 1))
+        self.post_dates = []
+
+        def generate():
+            for i in range(count):
+                pub_date = now - timedelta(seconds=rnd.random() * span)
+                self.post_dates.append(pub_date)
+                group_id = None
+                if groups and rnd.random() < 0.7:
+                    group_id = groups[_pick(rnd, group_weights)]
+                image = None
+                if images and rnd.random() < self.options['image_share']:
+                    image = rnd.choice(images)
+                yield Post(
+                    pk=first + i, author_id=users[_pick(rnd, authors)],
+                    group_id=group_id, image=image, pub_date=pub_date,
+                    modified=pub_date,
+                    text=f'Сгенерированный пост {first + i}',
+                )
+
+        self._insert(Post, generate())
+        return first
+
+    def _comments(self, users, first_post):
+        rnd = self.rnd
+        first = _next_id(Comment)
+        dates = self.post_dates
+        discussed = _cumulative(
+            rnd.paretovariate(DISCUSSION_ALPHA) for _ in dates)
+        now = timezone.now()
+
+        def generate():
+            for i in range(self.options['comments']):
+                index = _pick(rnd, discussed)
+                age = (now - dates[index]).total_seconds()
+                yield Comment(
+                    pk=first + i, post_id=first_post + index,
+                    author_id=rnd.choice(users),
+                    created=dates[index] + timedelta(
+                        seconds=rnd.random() * age),
+                    text=f'Комментарий {first + i}',
+                )
+
+        self._insert(Comment, generate())
+
+    def _follows(self, users):
+        rnd = self.rnd
+        first = _next_id(Follow)
+        popularity = _cumulative(
+            rnd.paretovariate(FOLLOWER_ALPHA) for _ in users)
+        per_user = min(self.options['follows_per_user'], len(users) - 1)
+        ids = itertools.count(first)
+
+        def generate():
+            for user_id in users:
+                wanted = rnd.randint(0, 2 * per_user)
+                authors = set()
+                # Попыток с запасом: популярных авторов выбирают часто.
+                for _ in range(wanted * 3):
+                    if len(authors) >= wanted:
+                        break
+                    author_id = users[_pick(rnd, popularity)]
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in authors:
+                    yield Follow(pk=next(ids), user_id=user_id,
+                                 author_id=author_id)
+
+        self._insert(Follow, generate())
+
+    def run(self):
+        users = self._users()
+        groups = self._groups()
+        images = self._image_pool()
+        first_post = self._posts(users, groups, images)
+        self._comments(users, first_post)
+        self._follows(users)
+        transfer.finish_import([User, *transfer.MODELS])
+        for name in images:
+            thumbnails.queue(name)
+        return self.counts
@@ -0,0 +1,123 @@
+"""
+Версии лент для кеширования фрагментов.
+
+Ключ фрагмента включает тип ленты, её идентификатор, страницу или курсор,
+зрителя и номер версии. Любая запись поста поднимает версию затронутых
+лент, так что устаревший фрагмент больше никогда не читается.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, DatabaseError
+
+from yatube import replicas
+
+
+FEED_CACHE_TIMEOUT = getattr(settings, 'FEED_CACHE_TIMEOUT', 600)
+FEED_COUNT_TIMEOUT = getattr(settings, 'FEED_COUNT_TIMEOUT', 60)
+
+# С такого размера таблицы общее число постов берётся из статистики
+# планировщика, а не из COUNT(*).
+ESTIMATE_THRESHOLD = getattr(settings, 'FEED_COUNT_ESTIMATE_THRESHOLD',
+                             100000)
+
+INDEX = 'index'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOW = 'follow'
+# Поднимается после каждой синхронизации реплик (sync_replica).
+REPLICA = 'replica'
+
+
+def _version_key(feed, ident):
+    return f'feed:version:{feed}:{ident}'
+
+
+def _fresh_version():
+    # Если счётчик вытеснен из кеша, новая версия не должна совпасть
+    # ни с одной из уже использованных.
+    return int(time.time() * 1000)
+
+
+def feed_version(feed, ident=''):
+    key = _version_key(feed, ident)
+    version = cache.get(key)
+    if version is None:
+        version = _fresh_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump(feed, ident=''):
+    key = _version_key(feed, ident)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def bump_post_feeds(author_id, group_slugs=()):
+    bump(INDEX)
+    bump(AUTHOR, author_id)
+    for slug in set(group_slugs):
+        if slug:
+            bump(GROUP, slug)
+
+
+def _full_version(feed, ident):
+    version = feed_version(feed, ident)
+    if feed == FOLLOW:
+        # Лента подписок меняется и от подписок, и от любых постов.
+        version = f'{version}.{feed_version(INDEX)}'
+    if replicas.replicas():
+        # Фрагмент, собранный по отставшей реплике уже под новой версией
+        # ленты, живёт только до следующей синхронизации.
+        version = f'{version}.{feed_version(REPLICA)}'
+    return version
+
+
+def feed_cache_key(request, feed, ident=''):
+    """Строка для `{% cache %}`, различающая страницу, зрителя и версию."""
+    version = _full_version(feed, ident)
+    position = (
+        request.GET.get('cursor') or request.GET.get('page') or '1')
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    return f'{feed}:{ident}:{version}:{position}:{viewer}'
+
+
+def estimated_count(model):
+    """Число строк таблицы по статистике СУБД или None, если её нет."""
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+def feed_count(feed, ident, queryset, estimate=False):
+    """
+    Число постов в ленте для пагинатора. Хранится в кеше под версией
+    ленты, так что запись поста сразу даёт новый подсчёт. Для всей
+    таблицы постов при `estimate=True` используется оценка СУБД.
+    """
+    key = f'feed:count:{feed}:{ident}:{_full_version(feed, ident)}'
+    count = cache.get(key)
+    if count is None:
+        count = estimated_count(queryset.model) if estimate else None
+        if count is None or count < ESTIMATE_THRESHOLD:
+            count = queryset.count()
+        cache.set(key, count, FEED_COUNT_TIMEOUT)
+    return count
@@ -0,0 +1,94 @@
+"""
+Граф подписок.
+
+Для каждого пользователя в кеше лежат id тех, на кого он подписан, и id
+его подписчиков: отсортированный массив 64-битных чисел, 8 байт на связь.
+При чтении массив превращается во frozenset, так что «подписан ли A на B»
+и «на кого подписан A» отвечаются за O(1) без запросов к Follow. Сигналы
+подписки и отписки сбрасывают оба затронутых множества после коммита,
+а заново множество читается из основной базы, не с реплики.
+"""
+from array import array
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+
+from .models import Follow
+
+
+GRAPH_TIMEOUT = 24 * 60 * 60
+
+FOLLOWEES = 'followees'
+FOLLOWERS = 'followers'
+
+
+def _key(kind, user_id):
+    return f'follow:{kind}:{user_id}'
+
+
+def _pack(ids):
+    return array('q', sorted(ids)).tobytes()
+
+
+def _unpack(raw):
+    ids = array('q')
+    ids.frombytes(raw)
+    return frozenset(ids)
+
+
+def _ids(kind, user_id):
+    key = _key(kind, user_id)
+    raw = cache.get(key)
+    if raw is None:
+        # Отставшая реплика закешировала бы старое множество на сутки.
+        follows = Follow.objects.using(DEFAULT_DB_ALIAS)
+        if kind == FOLLOWEES:
+            rows = follows.filter(user_id=user_id).values_list(
+                'author_id', flat=True)
+        else:
+            rows = follows.filter(author_id=user_id).values_list(
+                'user_id', flat=True)
+        raw = _pack(rows)
+        cache.set(key, raw, GRAPH_TIMEOUT)
+    return _unpack(raw)
+
+
+def followees(user_id):
+    """id авторов, на которых подписан пользователь."""
+    return _ids(FOLLOWEES, user_id)
+
+
+def followers(user_id):
+    """id подписчиков пользователя."""
+    return _ids(FOLLOWERS, user_id)
+
+
+def is_following(user_id, author_id):
+    return author_id in followees(user_id)
+
+
+def forget(user_id, author_id):
+    cache.delete_many([
+        _key(FOLLOWEES, user_id), _key(FOLLOWERS, author_id),
+    ])
+
+
+def follow(user_id, author_id):
+    """
+    Подписывает пользователя на автора, повторная подписка ничего не
+    делает. Возвращает True, если подписка создана.
+    """
+    if user_id == author_id:
+        return False
+    try:
+        # Уникальность пары держит ограничение в БД, а не проверка
+        # перед вставкой; сигналы post_save срабатывают как обычно.
+        with transaction.atomic():
+            Follow.objects.create(user_id=user_id, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user_id, author_id):
+    Follow.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -1,4 +1,6 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm, Textarea
+from .images import ingest
 from .models import Post, Comment
 
 
@@ -12,6 +14,13 @@ class PostForm(ModelForm):
             'image': 'Изображение'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Пережимаем только новые загрузки, а не уже сохранённый файл.
+        if isinstance(image, UploadedFile):
+            image = ingest(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
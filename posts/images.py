@@ -0,0 +1,126 @@
+"""
+Приём картинок постов.
+
+Размеры и формат проверяются по заголовку файла, без распаковки пикселей.
+Слишком большие оригиналы уменьшаются до POST_IMAGE_MAX_EDGE по длинной
+стороне (JPEG при этом сразу декодируется в уменьшенном масштабе),
+метаданные отбрасываются, картинка пережимается. В хранилище попадает
+уже обработанный файл, так что и диск, и последующая сборка миниатюр
+работают с ним, а не с исходником с камеры.
+"""
+import logging
+import os
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+# Режимы, которые PNG записывает как есть; остальные (CMYK, F, I, ...)
+# переводятся в RGB или RGBA.
+PNG_MODES = ('RGB', 'RGBA', 'L', 'LA', 'P')
+
+# Что бросает Pillow на битом или подозрительном файле, который прошёл
+# проверку заголовка в ImageField.
+DECODE_ERRORS = (OSError, SyntaxError, Image.DecompressionBombError)
+
+
+def _limits():
+    # Читается при каждом вызове, чтобы тесты могли менять настройки.
+    return (
+        getattr(settings, 'POST_IMAGE_MAX_BYTES', 10 * 1024 * 1024),
+        getattr(settings, 'POST_IMAGE_MAX_PIXELS', 40 * 1000 * 1000),
+        getattr(settings, 'POST_IMAGE_MAX_EDGE', 2048),
+        getattr(settings, 'POST_IMAGE_QUALITY', 85),
+    )
+
+
+def _encode(image, fmt, quality):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    elif fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=quality)
+    else:
+        if fmt == 'PNG' and image.mode not in PNG_MODES:
+            image = image.convert(
+                'RGBA' if image.mode in ('RGBa', 'PA') else 'RGB')
+        image.save(buffer, fmt, optimize=True)
+    return buffer.getvalue()
+
+
+def ingest(upload):
+    """
+    Проверяет загруженную картинку и возвращает файл для хранения.
+    Нарушение лимитов — ValidationError с понятным пользователю текстом.
+    """
+    max_bytes, max_pixels, max_edge, quality = _limits()
+    started = time.monotonic()
+
+    if upload.size > max_bytes:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': max_bytes // (1024 * 1024)})
+
+    upload.seek(0)
+    try:
+        return _reencode(upload, max_pixels, max_edge, quality, started)
+    except DECODE_ERRORS:
+        logger.info('Картинка %s не читается', upload.name, exc_info=True)
+        raise ValidationError(
+            'Файл повреждён или не поддерживается.', code='invalid_image')
+
+
+def _reencode(upload, max_pixels, max_edge, quality, started):
+    # open() читает только заголовок, пиксели ещё не распакованы.
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValidationError(
+            'Картинка %(width)d×%(height)d слишком велика.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height})
+
+    fmt = image.format if image.format in EXTENSIONS else 'PNG'
+    if getattr(image, 'is_animated', False):
+        # Пережатие анимации оставило бы один кадр; лимиты уже проверены.
+        upload.seek(0)
+        return upload
+
+    downscale = max(width, height) > max_edge
+    if downscale and fmt == 'JPEG':
+        # Декодер JPEG умеет распаковывать сразу в 1/2, 1/4 или 1/8
+        # размера, полноразмерный буфер в памяти не появляется. Размеры
+        # здесь ещё в ориентации файла, до поворота по EXIF.
+        scale = max_edge / max(width, height)
+        image.draft('RGB', (round(width * scale), round(height * scale)))
+    image = ImageOps.exif_transpose(image)
+    if downscale:
+        # Уже после поворота: у снимков с Orientation 5–8 ширина и
+        # высота меняются местами.
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    # Новый файл собирается из одних пикселей: EXIF, GPS и прочие
+    # метаданные оригинала в него не попадают.
+    content = _encode(image, fmt, quality)
+    base = os.path.splitext(os.path.basename(upload.name))[0]
+    name = f'{base}.{EXTENSIONS[fmt]}'
+    stored = SimpleUploadedFile(name, content, f'image/{fmt.lower()}')
+
+    logger.info(
+        'Картинка %s: %d×%d → %d×%d, %d → %d байт (−%d), %.0f мс',
+        upload.name, width, height, image.width, image.height,
+        upload.size, stored.size, upload.size - stored.size,
+        (time.monotonic() - started) * 1000)
+    return stored
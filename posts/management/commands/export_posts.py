@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки, по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        path = options['path']
+        output = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8'))
+        count = 0
+        try:
+            for line in export_lines():
+                output.write(line)
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        seconds = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено строк: {count} за {seconds:.1f} с '
+            f'({count / max(seconds, 1e-6):.0f} строк/с)'
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.dataset import DEFAULTS, Generator
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных тестов')
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=type(default),
+                default=default, help=f'По умолчанию {default}')
+
+    def progress(self, count, seconds):
+        self.stderr.write(
+            f'\rВставлено строк: {count} ({count / max(seconds, 1e-6):.0f} '
+            f'строк/с)', ending='')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        generator = Generator(
+            progress=self.progress,
+            **{name: options[name] for name in DEFAULTS})
+        counts = generator.run()
+        self.stderr.write('')
+        summary = ', '.join(
+            f'{label}: {count}' for label, count in counts.items())
+        self.stdout.write(
+            f'Готово за {time.monotonic() - started:.1f} с: {summary}')
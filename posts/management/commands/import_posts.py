@@ -0,0 +1,63 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (
+    BATCH_SIZE, finish_import, import_lines, ImportFailed,
+)
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из JSONL '
+            'и перестраивает счётчики, поиск, ленты и кеш')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки, по умолчанию stdin')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько объектов вставлять одной транзакцией')
+        parser.add_argument(
+            '--start-line', type=int, default=1,
+            help='С какой строки продолжить прерванный импорт')
+
+    def progress(self, count, seconds):
+        self.stderr.write(
+            f'\rЗагружено: {count} ({count / max(seconds, 1e-6):.0f} '
+            f'объектов/с)', ending='')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        source = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8'))
+        started = time.monotonic()
+        try:
+            totals = import_lines(source, options['batch_size'],
+                                  self.progress, options['start_line'])
+        except ImportFailed as e:
+            self.stderr.write('')
+            if e.totals:
+                # Загруженные пачки уже в базе, им нужны счётчики, индекс
+                # и ленты, как после полного импорта.
+                finish_import()
+            raise CommandError(
+                f'{e}. Загружено объектов: {sum(e.totals.values())}; '
+                f'после исправления файла продолжите с '
+                f'--start-line {e.start_line}')
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        loaded = time.monotonic() - started
+        self.stderr.write('')
+
+        finish_import()
+        total = sum(totals.values())
+        summary = ', '.join(
+            f'{label}: {count}' for label, count in totals.items())
+        self.stdout.write(
+            f'Загружено {total} объектов ({summary}) за {loaded:.1f} с, '
+            f'{total / max(loaded, 1e-6):.0f} объектов/с; '
+            f'пересчёт занял {time.monotonic() - started - loaded:.1f} с'
+        )
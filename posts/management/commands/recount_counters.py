@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики комментариев, постов, подписок и '
+            'ссылок на картинки')
+
+    def handle(self, *args, **options):
+        fixed = recount()
+        self.stdout.write(
+            f'Исправлено постов: {fixed["posts"]}, '
+            f'строк статистики: {fixed["users"]}, '
+            f'картинок: {fixed["images"]}'
+        )
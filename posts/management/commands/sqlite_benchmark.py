@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет чтения ленты и записи постов в секунду на копии базы: '
+            'с настройками SQLite по умолчанию и с прагмами проекта')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        try:
+            results = benchmark.run(options['readers'], options['writers'],
+                                    options['seconds'])
+        except ValueError as e:
+            raise CommandError(e)
+        self.stdout.write(
+            f'{"режим":<8}{"чтений/с":>12}{"записей/с":>12}'
+            f'{"ошибок":>9}{"p95 чтения":>13}{"p95 записи":>13}')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8}{result["reads"]:>12.0f}{result["writes"]:>12.0f}'
+                f'{result["errors"]:>9}'
+                f'{result["read_p95"] * 1000:>10.1f} мс'
+                f'{result["write_p95"] * 1000:>10.1f} мс')
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feed_cache
+from yatube import replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу в реплики из DATABASE_REPLICAS; '
+            'с --interval повторяет копирование, пока не остановят')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='aliases',
+            help='Алиас реплики; по умолчанию все из DATABASE_REPLICAS')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Пауза между копированиями в секундах; 0 — один раз')
+
+    def sync_all(self, aliases):
+        started = time.monotonic()
+        for alias in aliases:
+            replicas.sync(alias)
+        # Кеши, собранные по старой копии, больше не читаются.
+        feed_cache.bump(feed_cache.REPLICA)
+        self.stdout.write(
+            f'{", ".join(aliases)}: {time.monotonic() - started:.2f} с')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replicas.replicas()
+        if not aliases:
+            raise CommandError('Реплики не настроены (DATABASE_REPLICAS)')
+        synced = None
+        try:
+            while True:
+                # Нетронутую с прошлого раза базу не копируем.
+                version = replicas.primary_version()
+                if version != synced:
+                    self.sync_all(aliases)
+                    synced = version
+                if options['interval'] <= 0:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,47 @@
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+
+from . import page_cache
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Отдаёт анонимным GET-запросам лент и постов готовый ответ из кеша.
+    Ставится после AuthenticationMiddleware.
+
+    Стоит перед MessageMiddleware и отвечает раньше неё, поэтому запрос с
+    cookie сообщений идёт мимо кеша: иначе сообщения пропали бы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _cacheable(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if request.user.is_authenticated:
+            return False
+        if CookieStorage.cookie_name in request.COOKIES:
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in page_cache.CACHED_URL_NAMES
+
+    def __call__(self, request):
+        if not self._cacheable(request):
+            return self.get_response(request)
+
+        response = page_cache.get(request)
+        if response is not None:
+            return get_conditional_response(
+                request, etag=response.get('ETag'), response=response)
+
+        response = self.get_response(request)
+        # Ответы, ставящие cookie, принадлежат конкретному посетителю.
+        if (response.status_code == 200 and not response.streaming
+                and not response.cookies):
+            page_cache.store(request, response)
+        return response
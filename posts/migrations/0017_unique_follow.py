@@ -0,0 +1,51 @@
+# Generated by Django 2.2 on 2026-10-18 02:53
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field, outer):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def remove_duplicates(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    duplicates = (
+        Follow.objects.values('user', 'author')
+        .annotate(first=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    touched = set()
+    for row in duplicates.iterator():
+        Follow.objects.filter(
+            user=row['user'], author=row['author'],
+        ).exclude(id=row['first']).delete()
+        touched.update((row['user'], row['author']))
+
+    # Дубликаты учитывались в счётчиках, пересчитываем затронутых.
+    UserStats.objects.filter(user_id__in=touched).update(
+        followers_count=_count(Follow.objects.all(), 'author', 'user_id'),
+        following_count=_count(Follow.objects.all(), 'user', 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2 on 2026-10-18 03:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+
+    refs = (
+        Post.objects.filter(image__startswith='posts/')
+        .values('image').annotate(total=Count('id')).order_by()
+    )
+    StoredImage.objects.bulk_create(
+        StoredImage(name=row['image'], refs=row['total'])
+        for row in refs.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_unique_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,29 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
 
+class AtomicSaveModel(models.Model):
+    """
+    save() в одной транзакции с обработчиками post_save: счётчики и
+    ссылки на файлы картинок (storage.py) не расходятся с самой записью.
+    Удаление Django и так проводит в транзакции вместе с post_delete.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Без точки сохранения: внутри чужой транзакции ошибка и так
+        # откатит её целиком, а лишних запросов SAVEPOINT не будет.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=40, unique=True)
@@ -14,7 +33,13 @@ class Group(models.Model):
         return f'{self.pk} - {self.title}'
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Всё, что нужно карточке поста, одним запросом."""
+        return self.select_related('author', 'group')
+
+
+class Post(AtomicSaveModel):
     text = models.TextField()
     pub_date = models.DateTimeField('date_published', auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -22,10 +47,37 @@ class Post(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE,
                               related_name='group_posts',
                               blank=True, null=True)
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # Индекс нужен для подсчёта ссылок на файл, см. storage.release().
+    image = models.ImageField(upload_to='posts/', blank=True, null=True,
+                              storage=ContentAddressedStorage(),
+                              db_index=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Время последнего изменения поста или его комментариев, для ETag.
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
+
+
+class StoredImage(models.Model):
+    """Сколько постов ссылается на файл картинки, см. storage.py."""
+    name = models.CharField(max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name} - {self.refs}'
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -33,12 +85,53 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField('date_published', auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
+
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
                              related_name='follower')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='following')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
     def __str__(self):
         return f'follower - {self.user} following - {self.author}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'stats - {self.user_id}'
@@ -0,0 +1,88 @@
+"""
+Кеш целых страниц для анонимных читателей.
+
+Ключ ответа — путь, параметры из QUERY_PARAMS и версии пути и всех его
+префиксов, кроме корня: `/leo/5/` зависит от версий `/leo/5/` и
+`/leo/`. Запись поднимает версии ровно тех адресов, что она затронула
+(главная, группа, профиль, пост), а сброс профиля заодно сбрасывает и
+все посты автора, где показаны его счётчики. Залогиненные пользователи
+и посетители с непоказанными сообщениями кеш не видят.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from yatube import replicas
+
+from . import feed_cache
+
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+# Имена адресов, которые умеем сбрасывать, а значит, можем и кешировать.
+CACHED_URL_NAMES = {'index', 'group', 'profile', 'post', 'post_comments'}
+
+# Параметры, от которых зависят эти страницы. Остальные в ключ не входят:
+# иначе любой `?x=N` заводил бы новую запись и вытеснял горячие страницы.
+QUERY_PARAMS = ('page', 'cursor')
+
+PAGE = 'page'
+
+
+def _digest(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _scopes(path):
+    parts = [part for part in path.split('/') if part]
+    scopes = ['/' + '/'.join(parts[:size]) + '/'
+              for size in range(1, len(parts) + 1)]
+    return scopes or ['/']
+
+
+def page_key(request):
+    path = request.path
+    versions = '.'.join(
+        str(feed_cache.feed_version(PAGE, _digest(scope)))
+        for scope in _scopes(path)
+    )
+    if replicas.replicas():
+        versions += f'.{feed_cache.feed_version(feed_cache.REPLICA)}'
+    query = urlencode(
+        [(name, request.GET.get(name, '')) for name in QUERY_PARAMS])
+    return f'page:{_digest(path)}:{versions}:{_digest(query)}'
+
+
+def get(request):
+    return cache.get(page_key(request))
+
+
+def store(request, response):
+    cache.set(page_key(request), response, PAGE_CACHE_TIMEOUT)
+
+
+def purge(*paths):
+    for path in set(paths):
+        feed_cache.bump(PAGE, _digest(path))
+
+
+def purge_post(post, group_slugs=()):
+    """Главная, группы, профиль автора и страница поста."""
+    username = post.author.username
+    paths = [reverse('index'), reverse('profile', args=[username])]
+    if post.pk:
+        paths.append(reverse('post', args=[username, post.pk]))
+    paths += [reverse('group', args=[slug]) for slug in group_slugs if slug]
+    purge(*paths)
+
+
+def purge_profiles(*usernames):
+    """Профили вместе со всеми страницами постов их авторов."""
+    purge(*(reverse('profile', args=[username]) for username in usernames))
+
+
+def purge_groups(*slugs):
+    purge(*(reverse('group', args=[slug]) for slug in slugs if slug))
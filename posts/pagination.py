@@ -0,0 +1,222 @@
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+PAGE_SIZE = 10
+
+# Номерные ссылки `?page=N` обслуживаются обычным Paginator, но начиная
+# с этой страницы кнопка «Следующая» переключается на курсор, чтобы
+# глубокие страницы не требовали OFFSET.
+CURSOR_AFTER_PAGE = 5
+
+POST_ORDERING = ('-pub_date', '-id')
+
+# Комментарии идут от старых к новым и подгружаются курсором.
+COMMENT_PAGE_SIZE = 50
+COMMENT_ORDERING = ('created', 'id')
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW = 2
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _field_value(obj, field):
+    if isinstance(obj, dict):
+        return obj[field]
+    return getattr(obj, field)
+
+
+def encode_cursor(obj, ordering=POST_ORDERING, direction=NEXT):
+    """Непрозрачный токен позиции объекта в ленте."""
+    date_field, id_field = (name.lstrip('-') for name in ordering)
+    payload = [
+        direction,
+        _field_value(obj, date_field).isoformat(),
+        _field_value(obj, id_field),
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, date, pk = json.loads(base64.urlsafe_b64decode(padded))
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS) or date is None:
+        raise InvalidCursor(token)
+    # Больше не влезает в INTEGER базы: запрос упал бы с OverflowError.
+    if not 0 < pk < 2 ** 63:
+        raise InvalidCursor(token)
+    return direction, date, pk
+
+
+class CursorPage:
+    number = None
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Постраничная выдача по ключу (дата, id) без COUNT(*) и OFFSET.
+    Каждая страница — один запрос с условием по последней показанной
+    записи, поэтому глубокие страницы стоят столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def _after(self, date, pk, reverse=False):
+        date_field, id_field = self.ordering
+        lookups = []
+        for field in (date_field, id_field):
+            descending = field.startswith('-')
+            if reverse:
+                descending = not descending
+            lookups.append((field.lstrip('-'), 'lt' if descending else 'gt'))
+        (date_name, date_op), (id_name, id_op) = lookups
+        return (
+            Q(**{f'{date_name}__{date_op}': date})
+            | Q(**{date_name: date, f'{id_name}__{id_op}': pk})
+        )
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def _cursor(self, obj, direction):
+        return encode_cursor(obj, self.ordering, direction)
+
+    def rows_after(self, cursor=None):
+        """
+        Упорядоченный queryset строк после курсора, без среза. Подходит
+        для потоковой выдачи; курсор «назад» — с начала, битый курсор —
+        InvalidCursor: у клиента API нет страницы, на которую его вернуть.
+        """
+        queryset = self.object_list.order_by(*self.ordering)
+        direction, date, pk = decode_cursor(cursor) if cursor else (
+            None, None, None)
+        if direction == NEXT:
+            queryset = queryset.filter(self._after(date, pk))
+        return queryset
+
+    def page(self, cursor=None):
+        try:
+            direction, date, pk = decode_cursor(cursor) if cursor else (
+                None, None, None)
+        except InvalidCursor:
+            direction = None
+
+        limit = self.per_page + 1
+        if direction == PREVIOUS:
+            queryset = self.object_list.filter(
+                self._after(date, pk, reverse=True)
+            ).order_by(*self._reversed_ordering())
+            rows = list(queryset[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            queryset = self.object_list.order_by(*self.ordering)
+            if direction == NEXT:
+                queryset = queryset.filter(self._after(date, pk))
+            rows = list(queryset[:limit])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = direction == NEXT
+
+        return CursorPage(
+            rows, self,
+            next_cursor=(
+                self._cursor(rows[-1], NEXT) if rows and has_next else None),
+            previous_cursor=(
+                self._cursor(rows[0], PREVIOUS)
+                if rows and has_previous else None),
+        )
+
+
+def page_window(number, num_pages, width=PAGE_WINDOW):
+    """
+    Номера страниц вокруг текущей плюс первая и последняя; None на месте
+    пропуска. Для 500 страниц это десяток ссылок, а не 500.
+    """
+    start = max(number - width, 1)
+    end = min(number + width, num_pages)
+    window = list(range(start, end + 1))
+    if start > 1:
+        window[:0] = [1] if start == 2 else [1, None]
+    if end < num_pages:
+        window += [num_pages] if end == num_pages - 1 else [None, num_pages]
+    return window
+
+
+def paginate(request, object_list, per_page=PAGE_SIZE, count=None):
+    """
+    Возвращает пару (paginator, page) для ленты постов.
+
+    `?cursor=` включает выдачу по ключу, иначе работают старые ссылки
+    `?page=N`. На номерных страницах дальше CURSOR_AFTER_PAGE ссылка
+    «Следующая» уже курсорная. Известное заранее `count` (из счётчика
+    или кеша) избавляет Paginator от COUNT(*); это может быть и функция,
+    тогда курсорные страницы её не вызывают.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        paginator = CursorPaginator(object_list, per_page)
+        return paginator, paginator.page(cursor)
+
+    paginator = Paginator(object_list, per_page)
+    if callable(count):
+        count = count()
+    if count is not None:
+        # count у Paginator — cached_property, подставляем значение в неё.
+        paginator.count = count
+    page = paginator.get_page(request.GET.get('page'))
+    page.window = page_window(page.number, paginator.num_pages)
+    if page.has_next() and page.number >= CURSOR_AFTER_PAGE:
+        page.next_cursor = encode_cursor(page[len(page) - 1])
+    return paginator, page
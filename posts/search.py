@@ -0,0 +1,112 @@
+"""
+Полнотекстовый поиск по постам.
+
+На SQLite текст постов лежит в FTS5-таблице posts_post_fts (rowid = id
+поста), её обновляют сигналы сохранения и удаления поста. Массовые вставки
+мимо сигналов догоняются командой `manage.py rebuild_search_index`.
+Результаты упорядочены по bm25 и листаются курсором (ранг, id). На других
+СУБД поиск деградирует до icontains.
+"""
+import base64
+import json
+import re
+
+from django.db import connection
+
+from .models import Post
+from .pagination import PAGE_SIZE
+
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post):
+    if fts_available():
+        with connection.cursor() as db:
+            db.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            db.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+
+def unindex_post(post_id):
+    if fts_available():
+        with connection.cursor() as db:
+            db.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index():
+    if fts_available():
+        with connection.cursor() as db:
+            db.execute(f'DELETE FROM {FTS_TABLE}')
+            db.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}')
+
+
+def match_expression(query):
+    """Слова запроса как префиксы: «толст» найдёт «Толстой»."""
+    words = WORD_RE.findall(query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _encode(score, pk):
+    raw = json.dumps([score, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        score, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def matching_ids(query, cursor=None, limit=PAGE_SIZE):
+    """Пары (id, ранг) лучших совпадений после курсора."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    sql = (
+        f'SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [expression]
+    position = _decode(cursor) if cursor else None
+    if position is not None:
+        sql += (
+            f' AND (bm25({FTS_TABLE}) > %s'
+            f' OR (bm25({FTS_TABLE}) = %s AND rowid > %s))'
+        )
+        params += [position[0], position[0], position[1]]
+    sql += f' ORDER BY bm25({FTS_TABLE}), rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        return db.fetchall()
+
+
+def search_posts(query, cursor=None, per_page=PAGE_SIZE):
+    """Возвращает (посты страницы, курсор следующей страницы или None)."""
+    if not fts_available():
+        posts = list(
+            Post.objects.feed().filter(text__icontains=query)
+            .order_by('-pub_date', '-id')[:per_page]
+        )
+        return posts, None
+
+    rows = matching_ids(query, cursor, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _encode(rows[-1][1], rows[-1][0])
+    posts = Post.objects.feed().in_bulk([pk for pk, _ in rows])
+    return [posts[pk] for pk, _ in rows if pk in posts], next_cursor
@@ -0,0 +1,212 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    cards, counters, feed_cache, follow_graph, page_cache, search, storage,
+    thumbnails, timeline,
+)
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.demote(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_stats(instance.author_id, followers_count=1)
+        counters.change_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change_stats(instance.author_id, followers_count=-1)
+    counters.change_stats(instance.user_id, following_count=-1)
+
+
+def _group_slug(post):
+    # При каскадном удалении группы её строки в БД уже может не быть.
+    group = post.group if post.group_id else None
+    return group.slug if group else None
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._old_group_slug = None
+    instance._old_image = None
+    if instance.pk:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', 'image').first()
+        if previous is not None:
+            instance._old_group_slug, instance._old_image = previous
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feed_cache.bump_post_feeds(
+        instance.author_id,
+        [_group_slug(instance), getattr(instance, '_old_group_slug', None)],
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    slug = Group.objects.filter(pk=instance.group_id).values_list(
+        'slug', flat=True).first()
+    feed_cache.bump_post_feeds(instance.author_id, [slug])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_feeds(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group__slug').first()
+    if post is not None:
+        feed_cache.bump_post_feeds(post['author_id'], [post['group__slug']])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.FOLLOW, instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def queue_post_thumbnails(sender, instance, **kwargs):
+    thumbnails.queue_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    old_image = getattr(instance, '_old_image', None) or None
+    new_image = instance.image.name or None
+    if old_image != new_image:
+        storage.acquire(new_image)
+        storage.release(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    page_cache.purge_post(
+        instance,
+        [_group_slug(instance), getattr(instance, '_old_group_slug', None)],
+    )
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    slug = Group.objects.filter(pk=instance.group_id).values_list(
+        'slug', flat=True).first()
+    page_cache.purge_post(instance, [slug])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_commented_post_pages(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).select_related(
+        'author', 'group').first()
+    if post is not None:
+        page_cache.purge_post(post, [_group_slug(post)])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_profiles(sender, instance, **kwargs):
+    usernames = User.objects.filter(
+        pk__in=[instance.user_id, instance.author_id]
+    ).values_list('username', flat=True)
+    page_cache.purge_profiles(*usernames)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_follow_graph(sender, instance, **kwargs):
+    # До коммита параллельный запрос прочитал бы старое множество и
+    # положил его обратно в кеш на GRAPH_TIMEOUT.
+    user_id, author_id = instance.user_id, instance.author_id
+    transaction.on_commit(lambda: follow_graph.forget(user_id, author_id))
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._old_slug = None
+    if instance.pk:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def refresh_group_cards(sender, instance, created, **kwargs):
+    if not created:
+        cards.refresh(Post.objects.filter(group=instance),
+                      old_slugs=[getattr(instance, '_old_slug', None)])
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    # Вход в систему сохраняет только last_login, лишний запрос не нужен.
+    instance._old_username = None
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def refresh_renamed_author_cards(sender, instance, **kwargs):
+    old_username = getattr(instance, '_old_username', None)
+    if old_username and old_username != instance.username:
+        cards.refresh(Post.objects.filter(author=instance),
+                      old_usernames=[old_username])
@@ -0,0 +1,115 @@
+"""
+Хранилище картинок постов с именами по содержимому.
+
+Файл сохраняется как `posts/ab/<sha256>.<ext>`: одинаковые картинки
+получают одно имя и лежат на диске один раз, а миниатюры sorl, ключи
+которых строятся от имени исходника, тоже собираются один раз.
+
+Сколько постов ссылается на файл, хранит строка StoredImage: счётчик
+меняется UPDATE ... SET refs = refs ± 1 в транзакции записи поста, а
+файл без ссылок удаляется вместе с миниатюрами после коммита (release()).
+Эта же строка служит замком на имя: сохранение проверяет файл на диске,
+только захватив её, и делает это в транзакции Post.save(), а удаление
+держит её до конца удаления файла. Поэтому повторная загрузка не может
+сослаться на файл, который в этот момент удаляется: она либо увидит
+счётчик раньше удаления, либо увидит, что файла нет, и запишет его снова.
+"""
+import hashlib
+import logging
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        with transaction.atomic():
+            _change_refs(name, 0)
+            if self.exists(name):
+                # Такой файл уже есть: повторная загрузка не пишет на диск.
+                return name
+            return super()._save(name, content)
+
+
+def _tracked(name):
+    # Файлы вне каталога posts/ (например, заданные тестами) не трогаем.
+    return bool(name) and name.startswith('posts/')
+
+
+def _change_refs(name, delta):
+    """
+    Сдвигает счётчик ссылок на файл. UPDATE захватывает строку до конца
+    транзакции, даже когда delta == 0; строки ещё нет — она создаётся.
+    """
+    # Импорт здесь: модели импортируют это хранилище.
+    from .models import StoredImage
+
+    refs = F('refs') + delta if delta >= 0 else Greatest(F('refs') + delta, 0)
+    if StoredImage.objects.filter(name=name).update(refs=refs):
+        return
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, refs=max(delta, 0))
+    except IntegrityError:
+        # Строку только что создала параллельная транзакция.
+        StoredImage.objects.filter(name=name).update(refs=refs)
+
+
+def _release(name):
+    from sorl.thumbnail import delete
+
+    from . import thumbnails
+    from .models import Post, StoredImage
+
+    with transaction.atomic():
+        # Строка удаляется только без ссылок, и до коммита её не может
+        # захватить сохранение того же файла (_save).
+        deleted, _ = StoredImage.objects.filter(name=name, refs=0).delete()
+        if not deleted or Post.objects.filter(image=name).exists():
+            return
+        try:
+            thumbnails.forget(name)
+            delete(thumbnails.source_file(name))
+        except Exception:
+            logger.exception('Не удалось удалить картинку %s', name)
+
+
+def acquire(name):
+    """Учитывает новую ссылку поста на файл; вызывается в транзакции."""
+    if _tracked(name):
+        _change_refs(name, 1)
+
+
+def release(name):
+    """
+    Снимает ссылку поста на файл и после коммита удаляет файл с
+    миниатюрами, если ссылок больше нет.
+    """
+    if _tracked(name):
+        _change_refs(name, -1)
+        transaction.on_commit(lambda: _release(name))
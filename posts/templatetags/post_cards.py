@@ -0,0 +1,12 @@
+from django import template
+
+from posts.cards import render_cards
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки страницы ленты: готовые из кеша, остальные рендерятся."""
+    return render_cards(posts, context.get('user'))
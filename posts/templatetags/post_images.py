@@ -0,0 +1,14 @@
+from django import template
+
+from posts.thumbnails import resolve_thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, size='card'):
+    thumbnails = getattr(post, 'thumbnails', {})
+    if size not in thumbnails:
+        resolve_thumbnails([post], size)
+    return post.thumbnails[size]
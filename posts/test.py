@@ -3,7 +3,6 @@ from django.test.client import Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-import time
 from .models import Post, Group, Follow
 
 
@@ -345,12 +344,6 @@ class TestCach(TestCase):
             {'text': 'Test_text_2', 'author': self.user},
             follow=True
             )
-        response_index = self.client.get(reverse('index'))
-        self.assertContains(response_index, 'Test_text_1')
-        self.assertNotContains(response_index, 'Test_text_2')
-
-        time.sleep(20)
-
         response_index = self.client.get(reverse('index'))
         self.assertContains(response_index, 'Test_text_2')
         self.assertNotContains(response_index, 'Test_text_1')
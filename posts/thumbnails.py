@@ -0,0 +1,343 @@
+"""
+Заблаговременная генерация миниатюр картинок постов.
+
+Сохранение поста с картинкой ставит сборку миниатюр всех размеров из
+POST_THUMBNAILS в очередь локального пула потоков; запрос, отрисовывающий
+ленту, только ищет готовую миниатюру в key-value хранилище sorl и, если
+её ещё нет, показывает заглушку. Ресайз внутри запроса не выполняется.
+
+Каждый размер собирается в нескольких вариантах: уже по ширинам из
+POST_THUMBNAIL_WIDTHS и в форматах POST_THUMBNAIL_FORMATS (WebP), для
+`srcset` и `<picture>`. Миниатюры всей страницы ищутся разом: сначала в
+LRU процесса, потом одним get_many в кеше и одним запросом в kvstore.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from yatube import metrics
+
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS = getattr(settings, 'POST_THUMBNAILS', {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+})
+
+# Дополнительные ширины и форматы вариантов каждого размера.
+WIDTHS = getattr(settings, 'POST_THUMBNAIL_WIDTHS', (480, 720))
+FORMATS = getattr(settings, 'POST_THUMBNAIL_FORMATS', ('WEBP',))
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+LRU_SIZE = getattr(settings, 'POST_THUMBNAIL_LRU_SIZE', 4096)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Найденные миниатюры не меняются: имя зависит от исходника и параметров,
+# поэтому их можно держать в памяти процесса. Промахи сюда не попадают.
+resolved = LRUCache(LRU_SIZE)
+
+
+def _variants(geometry, options):
+    """
+    Список (формат, ширина, геометрия, опции); первым идёт основной
+    вариант в формате исходника, формат None.
+    """
+    width, _, height = geometry.partition('x')
+    width = int(width)
+    widths = [width] + sorted(w for w in WIDTHS if w < width)
+    result = []
+    for fmt in (None,) + tuple(FORMATS):
+        for w in widths:
+            variant_options = dict(options)
+            if fmt:
+                variant_options['format'] = fmt
+            variant_geometry = str(w)
+            if height:
+                variant_geometry += f'x{round(int(height) * w / width)}'
+            result.append((fmt, w, variant_geometry, variant_options))
+    return result
+
+
+VARIANTS = {
+    size: _variants(geometry, options)
+    for size, (geometry, options) in THUMBNAILS.items()
+}
+
+
+class ResponsiveImage:
+    """Основная миниатюра плюс готовые варианты для srcset."""
+
+    def __init__(self, image, variants):
+        self.image = image
+        self.variants = variants
+
+    @property
+    def url(self):
+        return self.image.url
+
+    @property
+    def width(self):
+        return self.image.width
+
+    @property
+    def height(self):
+        return self.image.height
+
+    def _srcset(self, fmt):
+        return ', '.join(
+            f'{image.url} {width}w'
+            for (variant_fmt, width), image in sorted(
+                self.variants.items(), key=lambda item: item[0][1])
+            if variant_fmt == fmt
+        )
+
+    @property
+    def srcset(self):
+        return self._srcset(None)
+
+    @property
+    def sources(self):
+        """Пары (MIME-тип, srcset) для <source> в <picture>."""
+        return [
+            (MIME_TYPES.get(fmt, f'image/{fmt.lower()}'), self._srcset(fmt))
+            for fmt in FORMATS
+            if any(variant_fmt == fmt for variant_fmt, _ in self.variants)
+        ]
+
+
+def _workers():
+    # Читается при каждом вызове, чтобы тесты могли выставить 0.
+    return getattr(settings, 'POST_THUMBNAIL_WORKERS', 2)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_workers(), thread_name_prefix='thumbnails')
+        return _executor
+
+
+def source_file(name):
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def thumbnail_file(image, geometry, options):
+    """
+    ImageFile миниатюры с тем же именем, что построил бы get_thumbnail(),
+    но без обращения к самой картинке.
+    """
+    backend = default.backend
+    source = source_file(image.name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def _fetch_raw(keys):
+    """Сырые значения kvstore для ключей: get_many в кеше, затем в БД."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        kvstore.cache.set_many(rows, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(rows)
+    return {
+        key: value for key, value in values.items()
+        if value and value != EMPTY_VALUE
+    }
+
+
+def _variant_keys(image, size):
+    return [
+        (add_prefix(thumbnail_file(image, geometry, options).key), fmt, width)
+        for fmt, width, geometry, options in VARIANTS[size]
+    ]
+
+
+def lookup(images, size='card'):
+    """
+    Готовые миниатюры для набора картинок: {имя картинки: ResponsiveImage}.
+    Картинки без основной миниатюры в ответ не попадают; всё, чего не
+    хватает, ставится в очередь.
+    """
+    names = {}
+    for image in images:
+        for key, fmt, width in _variant_keys(image, size):
+            names.setdefault(key, (image.name, fmt, width))
+    if not names:
+        return {}
+
+    found = resolved.get_many(names)
+    missing = [key for key in names if key not in found]
+    if missing:
+        fetched = {
+            key: deserialize_image_file(value)
+            for key, value in _fetch_raw(missing).items()
+        }
+        resolved.set_many(fetched)
+        found.update(fetched)
+
+    variants = {}
+    for key, (name, fmt, width) in names.items():
+        variants.setdefault(name, {})
+        if key in found:
+            variants[name][fmt, width] = found[key]
+        else:
+            queue(name)
+
+    base_fmt, base_width = VARIANTS[size][0][:2]
+    ready = {
+        name: ResponsiveImage(files[base_fmt, base_width], files)
+        for name, files in variants.items()
+        if (base_fmt, base_width) in files
+    }
+    metrics.record('thumbnail_hits', len(ready))
+    return ready
+
+
+def resolve_thumbnails(posts, size='card'):
+    """Проставляет post.thumbnails[size] всем постам страницы."""
+    posts = list(posts)
+    found = lookup([post.image for post in posts if post.image], size)
+    for post in posts:
+        if not hasattr(post, 'thumbnails'):
+            post.thumbnails = {}
+        post.thumbnails[size] = (
+            found.get(post.image.name) if post.image else None)
+    return posts
+
+
+def forget(name):
+    """Забывает миниатюры картинки в памяти процесса перед её удалением."""
+    source = source_file(name)
+    resolved.delete_many([
+        key for size in VARIANTS for key, _, _ in _variant_keys(source, size)
+    ])
+    _pending.discard(name)
+
+
+def ready_thumbnail(image, size='card'):
+    """Основная миниатюра или None; отсутствующая ставится в очередь."""
+    if not image:
+        return None
+    responsive = lookup([image], size).get(image.name)
+    return responsive.image if responsive else None
+
+
+def build(name):
+    started = time.perf_counter()
+    try:
+        source = source_file(name)
+        for variants in VARIANTS.values():
+            for _, _, geometry, options in variants:
+                get_thumbnail(source, geometry, **options)
+    except Exception:
+        # Имя остаётся в _pending: битую картинку не пересобираем на
+        # каждом показе, только после перезапуска процесса.
+        logger.exception('Не удалось построить миниатюры для %s', name)
+    else:
+        _pending.discard(name)
+        # Ленты, страницы и ETag, собранные до этого, показывают заглушку.
+        # Импорт здесь: cards сам импортирует этот модуль.
+        from .cards import refresh
+        refresh(Post.objects.filter(image=name))
+    finally:
+        metrics.record('thumbnail_seconds', time.perf_counter() - started)
+
+
+def _build_in_worker(name):
+    # У потоков пула свои соединения с БД, закрываем их сами.
+    close_old_connections()
+    try:
+        build(name)
+    finally:
+        close_old_connections()
+
+
+def queue(name):
+    """Ставит сборку миниатюр в пул; повторы одной картинки схлопываются."""
+    if not name or name in _pending:
+        return
+    _pending.add(name)
+    metrics.record('thumbnail_queued')
+    if not _workers():
+        build(name)
+    else:
+        _get_executor().submit(_build_in_worker, name)
+
+
+def queue_post(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: queue(name))
@@ -0,0 +1,155 @@
+"""
+Материализованные ленты подписок (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+`/follow/` читает один срез таблицы TimelineEntry. Посты популярных
+авторов не раскладываются, а подмешиваются при чтении (fan-out-on-read),
+чтобы одна запись не превращалась в миллион вставок.
+
+Когда автор опускается ниже порога, его посты, которые не раскладывались,
+дописываются в ленты всех подписчиков (demote()), иначе они пропали бы
+из `/follow/` до полной пересборки.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from . import follow_graph
+from .models import Follow, Post, TimelineEntry
+
+
+POPULAR_AUTHORS_KEY = 'timeline:popular_authors'
+POPULAR_AUTHORS_TIMEOUT = 300
+
+
+def fanout_limit():
+    # Читается при каждом вызове, чтобы тесты могли менять настройки.
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+
+
+def backfill_size():
+    return getattr(settings, 'TIMELINE_BACKFILL_SIZE', 1000)
+
+
+def popular_authors():
+    """Авторы, чьи посты подмешиваются при чтении, а не раскладываются."""
+    authors = cache.get(POPULAR_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(
+            Follow.objects.values('author')
+            .annotate(followers=Count('id'))
+            .filter(followers__gte=fanout_limit())
+            .values_list('author', flat=True)
+        )
+        cache.set(POPULAR_AUTHORS_KEY, authors, POPULAR_AUTHORS_TIMEOUT)
+    return authors
+
+
+def _insert(entries):
+    # Размер пачки выбирает Django: SQLite не принимает больше 500 строк
+    # в одной вставке.
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out(post):
+    if post.author_id in popular_authors():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    if author_id in popular_authors():
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:backfill_size()]
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def demote(author_id):
+    """
+    Вызывается после отписки. Если автор только что опустился ниже
+    порога, после коммита его последние посты раскладываются по лентам
+    всех подписчиков.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers != fanout_limit() - 1:
+        return
+
+    def refill():
+        # Сначала сбрасываем кеш: новые посты автора уже раскладываются,
+        # а всё, что было до этого, дописывает _fill().
+        cache.delete(POPULAR_AUTHORS_KEY)
+        _fill(author_id=author_id)
+
+    transaction.on_commit(refill)
+
+
+def _fill(author_id=None, exclude=()):
+    """
+    Одним INSERT ... SELECT раскладывает каждому подписчику последние
+    backfill_size() постов автора: только `author_id` или всех, кроме
+    `exclude`. Уже лежащие в лентах записи пропускаются.
+    """
+    posts_where, follows_where, params = '', '', []
+    if author_id is not None:
+        posts_where = 'WHERE author_id = %s'
+        params.append(author_id)
+    params.append(backfill_size())
+    if exclude:
+        follows_where = 'AND f.author_id NOT IN (%s)' % ', '.join(
+            ['%s'] * len(exclude))
+        params.extend(exclude)
+    ops = connection.ops
+    sql = f"""
+        {ops.insert_statement(ignore_conflicts=True)}
+        {TimelineEntry._meta.db_table} (user_id, post_id, pub_date)
+        SELECT f.user_id, p.id, p.pub_date
+        FROM {Follow._meta.db_table} f
+        JOIN (
+            SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM {Post._meta.db_table} {posts_where}
+        ) p ON p.author_id = f.author_id
+        WHERE p.position <= %s {follows_where}
+        {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def rebuild():
+    """
+    Собирает все ленты заново по таблице подписок одним INSERT ... SELECT:
+    каждому подписчику — последние backfill_size() постов каждого автора,
+    кроме популярных, как при backfill().
+    """
+    TimelineEntry.objects.all().delete()
+    _fill(exclude=list(popular_authors()))
+
+
+def timeline_posts(user):
+    """Посты ленты подписок пользователя, ещё без сортировки."""
+    popular = popular_authors() & follow_graph.followees(user.pk)
+    if not popular:
+        return Post.objects.filter(timeline_entries__user=user)
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(Q(id__in=entries) | Q(author_id__in=popular))
@@ -0,0 +1,185 @@
+"""
+Перенос постов, комментариев и подписок между окружениями в JSONL.
+
+Строка файла — объект в формате сериализаторов Django:
+{"model": "posts.post", "pk": 1, "fields": {...}}, внешние ключи — id.
+Пользователи не переносятся и должны уже быть в целевой базе.
+
+Импорт читает файл построчно и пишет пачками bulk_create, каждая пачка в
+своей транзакции, так что память не зависит от размера файла. Сигналы
+при этом не срабатывают: счётчики, поисковый индекс, ленты подписок и
+кеш перестраиваются один раз в конце (finish_import()).
+
+Если строка не разбирается или пачка не вставляется (повтор pk, нет
+автора или поста, неверная дата), импорт останавливается с
+ImportFailed. Пачки до неё уже в базе, сбойная откачена целиком; с
+`start_line` из исключения импорт продолжается после исправления файла.
+"""
+import datetime
+import json
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, IntegrityError, transaction
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post
+
+
+# Порядок важен: модели идут после тех, на кого ссылаются.
+MODELS = [Group, Post, Comment, Follow]
+MODELS_BY_LABEL = {model._meta.label_lower: model for model in MODELS}
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 2000
+
+# Что бросает разбор строки: не JSON, нет ключа, "fields" не объект.
+PARSE_ERRORS = (ValueError, KeyError, TypeError, AttributeError)
+# Что бросает вставка пачки: ограничения БД и значения, которые поле не
+# может привести к своему типу.
+WRITE_ERRORS = (IntegrityError, ValidationError, ValueError, TypeError)
+
+
+class Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд, а выгрузка должна
+    # совпадать с базой до микросекунды.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _fields(model):
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def export_lines(models=MODELS):
+    """Строки JSONL всех объектов, читаются из БД кусками."""
+    encoder = Encoder(ensure_ascii=False)
+    for model in models:
+        fields = _fields(model)
+        label = model._meta.label_lower
+        rows = model.objects.order_by('pk').values_list(
+            'pk', *(field.attname for field in fields))
+        for pk, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield encoder.encode({
+                'model': label, 'pk': pk,
+                'fields': {
+                    field.name: value for field, value in zip(fields, values)
+                },
+            }) + '\n'
+
+
+@contextmanager
+def original_dates(model):
+    # bulk_create вызывает pre_save, и auto_now/auto_now_add затёрли бы
+    # даты из файла текущим временем.
+    changed = []
+    for field in _fields(model):
+        if getattr(field, 'auto_now', False) or getattr(
+                field, 'auto_now_add', False):
+            changed.append((field, field.auto_now, field.auto_now_add))
+            field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _build(model, record):
+    attnames = {field.name: field.attname for field in _fields(model)}
+    values = {attnames[name]: value
+              for name, value in record['fields'].items() if name in attnames}
+    return model(pk=record['pk'], **values)
+
+
+def _write(model, batch):
+    with original_dates(model), transaction.atomic():
+        model.objects.bulk_create(batch)
+
+
+class ImportFailed(ValueError):
+    """
+    Импорт остановлен. `start_line` — первая строка, которая не попала в
+    базу, `totals` — что успело загрузиться.
+    """
+
+    def __init__(self, message, start_line, totals):
+        super().__init__(message)
+        self.start_line = start_line
+        self.totals = totals
+
+
+def import_lines(lines, batch_size=BATCH_SIZE, progress=None, start_line=1):
+    """
+    Загружает объекты из строк JSONL, начиная со строки `start_line`.
+    `progress(count, seconds)` вызывается после каждой пачки. Возвращает
+    {метка модели: число}.
+    """
+    started = time.monotonic()
+    totals = {}
+    model, batch = None, []
+    # Номера первой и последней строки текущей пачки.
+    first = last = start_line
+
+    def flush():
+        nonlocal first
+        if batch:
+            try:
+                _write(model, batch)
+            except WRITE_ERRORS as e:
+                raise ImportFailed(
+                    f'Строки {first}–{last}: {e}', first, totals)
+            label = model._meta.label_lower
+            totals[label] = totals.get(label, 0) + len(batch)
+            batch.clear()
+            if progress:
+                progress(sum(totals.values()), time.monotonic() - started)
+        first = last + 1
+
+    for number, line in enumerate(lines, 1):
+        if number < start_line:
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            record_model = MODELS_BY_LABEL[record['model']]
+            obj = _build(record_model, record)
+        except PARSE_ERRORS as e:
+            flush()
+            raise ImportFailed(f'Строка {number}: {e!r}', number, totals)
+        if record_model is not model:
+            flush()
+            first = number
+            model = record_model
+        last = number
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return totals
+
+
+def finish_import(models=MODELS):
+    """
+    Всё, что при обычной записи делают сигналы, одним проходом.
+    `models` — модели, которым после вставки с явными id нужно сдвинуть
+    счётчик первичного ключа.
+    """
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    counters.recount()
+    search.rebuild_index()
+    # Версии лент, счётчики лент, графы подписок и страницы разбросаны
+    # по тысячам ключей; после массовой загрузки проще начать с нуля.
+    cache.clear()
+    timeline.rebuild()
@@ -2,31 +2,50 @@ from django.shortcuts import render
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from .models import Post, Group, User, Follow
+from django.views.decorators.http import condition
+from .models import Post, Group, User
 from .forms import PostForm, CommentForm
+from .counters import stats_for
+from . import conditional, feed_cache, follow_graph
+from .pagination import (
+    COMMENT_ORDERING, COMMENT_PAGE_SIZE, CursorPaginator, paginate,
+    POST_ORDERING,
+)
+from .search import search_posts
+from .timeline import timeline_posts
 
 
+@condition(etag_func=conditional.index_etag)
 def index(request):
-    post_list = Post.objects.order_by('-pub_date').all()
-    paginator = Paginator(post_list, 10)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page,
-                  'paginator': paginator})
+    post_list = Post.objects.feed().order_by(*POST_ORDERING)
+    paginator, page = paginate(
+        request, post_list,
+        count=lambda: feed_cache.feed_count(
+            feed_cache.INDEX, '', post_list, estimate=True),
+    )
+    return render(request, 'index.html', {
+        'page': page, 'paginator': paginator,
+        'feed_key': feed_cache.feed_cache_key(request, feed_cache.INDEX),
+        'feed_timeout': feed_cache.FEED_CACHE_TIMEOUT,
+    })
 
 
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.group_posts.order_by('-pub_date')
-    paginator = Paginator(posts_list, 10)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'group.html', {'page': page,
-                  'paginator': paginator, 'group': group})
+    posts_list = group.group_posts.feed().order_by(*POST_ORDERING)
+    paginator, page = paginate(
+        request, posts_list,
+        count=lambda: feed_cache.feed_count(
+            feed_cache.GROUP, group.slug, posts_list),
+    )
+    return render(request, 'group.html', {
+        'page': page, 'paginator': paginator, 'group': group,
+        'feed_key': feed_cache.feed_cache_key(
+            request, feed_cache.GROUP, group.slug),
+        'feed_timeout': feed_cache.FEED_CACHE_TIMEOUT,
+    })
 
 
 @login_required
@@ -43,36 +62,45 @@ def new_post(request):
     return render(request, 'posts/new.html', {'form': form})
 
 
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
     username = get_object_or_404(User, username=username)
 
-    post_list = username.author_posts.order_by('-pub_date')
-    count = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = username.author_posts.feed().order_by(*POST_ORDERING)
+    stats = stats_for(username)
+    paginator, page = paginate(request, post_list, count=stats.posts_count)
 
-    author = get_object_or_404(User, username=username)
+    author = username
+    is_following = (
+        request.user.is_authenticated
+        and follow_graph.is_following(request.user.pk, author.pk)
+    )
 
     return render(
         request, 'posts/profile.html', {
-            'username': username, 'count': count, 'page': page,
-            'paginator': paginator, 'author': author
+            'username': username, 'count': stats.posts_count, 'page': page,
+            'paginator': paginator, 'author': author, 'stats': stats,
+            'is_following': is_following,
+            'feed_key': feed_cache.feed_cache_key(
+                request, feed_cache.AUTHOR, author.pk),
+            'feed_timeout': feed_cache.FEED_CACHE_TIMEOUT,
             }
         )
 
 
+@condition(etag_func=conditional.post_etag)
 def post_view(request, username, post_id):
     username = get_object_or_404(User, username=username)
-    count = username.author_posts.count()
-    post = get_object_or_404(Post, id=post_id)
+    stats = stats_for(username)
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
     form = CommentForm()
-    items = post.comments.all()
+    items = _comments_page(request, post)
 
     return render(
         request, 'posts/post.html', {
             'username': username,
-            'count': count,
+            'count': stats.posts_count,
+            'stats': stats,
             'post': post,
             'form': form,
             'items': items
@@ -80,6 +108,24 @@ def post_view(request, username, post_id):
     )
 
 
+def _comments_page(request, post):
+    """Страница комментариев поста после курсора."""
+    comments = post.comments.select_related('author')
+    paginator = CursorPaginator(comments, COMMENT_PAGE_SIZE, COMMENT_ORDERING)
+    return paginator.page(request.GET.get('cursor'))
+
+
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(
+        Post.objects.select_related('author'), id=post_id,
+        author__username=username)
+    items = _comments_page(request, post)
+    return render(request, 'posts/comment_list.html', {
+        'post': post, 'items': items,
+    })
+
+
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -96,6 +142,16 @@ def post_edit(request, username, post_id):
     return redirect('post', username=username, post_id=post_id)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = [], None
+    if query:
+        posts, next_cursor = search_posts(query, request.GET.get('cursor'))
+    return render(request, 'posts/search.html', {
+        'query': query, 'posts': posts, 'next_cursor': next_cursor
+    })
+
+
 def page_not_found(request, exception):
     return render(request, 'misc/404.html', {'path': request.path},
                   status=404)
@@ -109,7 +165,7 @@ def server_error(request):
 def add_comment(request, username, post_id):
     if request.method == 'POST':
         form_comment = CommentForm(request.POST)
-        if form_comment.is_valid:
+        if form_comment.is_valid():
             form = form_comment.save(commit=False)
             form.author_id = request.user.pk
             form.post_id = post_id
@@ -119,34 +175,32 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    follow = Follow.objects.filter(user=request.user)
-    authors = (i.author for i in follow)
-    posts_list = Post.objects.filter(
-        author__in=authors).order_by('-pub_date')
-    paginator = Paginator(posts_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts_list = timeline_posts(request.user).feed().order_by(
+        *POST_ORDERING)
+    paginator, page = paginate(
+        request, posts_list,
+        count=lambda: feed_cache.feed_count(
+            feed_cache.FOLLOW, request.user.pk, posts_list),
+    )
     return render(
-        request, 'posts/follow.html', {'page': page, 'paginator': paginator}
+        request, 'posts/follow.html', {
+            'page': page, 'paginator': paginator,
+            'feed_key': feed_cache.feed_cache_key(
+                request, feed_cache.FOLLOW, request.user.pk),
+            'feed_timeout': feed_cache.FEED_CACHE_TIMEOUT,
+            }
         )
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author).exists()
-    if follow:
-        return redirect('profile', username=username)
-    else:
-        if request.user != author:
-            Follow.objects.create(user=request.user, author=author)
+    follow_graph.follow(request.user.pk, author.pk)
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author).exists()
-    if follow:
-        Follow.objects.filter(user=request.user, author=author).delete()
+    follow_graph.unfollow(request.user.pk, author.pk)
     return redirect('profile', username=username)
@@ -1,4 +1,32 @@
+import pytest
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def cache_in_tmp(settings, tmp_path):
+    # Свой файл кеша на каждый тест: рабочий cache.sqlite3 не трогаем, и
+    # ничего не переживает тест.
+    settings.CACHES = {'default': {
+        **settings.CACHES['default'],
+        'LOCATION': str(tmp_path / 'cache.sqlite3'),
+    }}
+
+
+@pytest.fixture(autouse=True)
+def media_in_tmp(settings, tmp_path):
+    # Картинки, миниатюры и пул картинок генератора данных не должны
+    # попадать в рабочий каталог media/.
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+
+
+@pytest.fixture(autouse=True)
+def build_thumbnails_inline(settings):
+    # Без пула потоков миниатюры не пишут в тестовую БД параллельно тесту.
+    settings.POST_THUMBNAIL_WORKERS = 0
+    from posts import thumbnails
+    thumbnails.resolved.clear()
@@ -0,0 +1,67 @@
+"""
+Бюджеты запросов: сколько SQL-запросов и байт ответа может стоить страница.
+
+Каждая страница замеряется на маленьком и на большом наборе данных.
+Бюджет ловит и просто лишние запросы, и запросы, число которых растёт
+с данными (N+1): в сообщении об ошибке перечисляется SQL, которого на
+большом наборе стало больше, чем на маленьком.
+"""
+import re
+from collections import Counter, namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+Budget = namedtuple('Budget', 'queries bytes')
+Measurement = namedtuple('Measurement', 'status queries size')
+
+# Числа и строки в SQL заменяются на ?, чтобы запросы к разным постам
+# считались одним и тем же запросом.
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize(sql):
+    return LITERALS.sub('?', sql)
+
+
+def measure(client, method, url, data=None):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data or {})
+    content = b''.join(response) if response.streaming else response.content
+    return Measurement(
+        response.status_code,
+        [query['sql'] for query in context.captured_queries],
+        len(content),
+    )
+
+
+def grown(small, large):
+    """SQL, которого на большом наборе выполнилось больше, с числом лишних."""
+    extra = (Counter(map(normalize, large.queries))
+             - Counter(map(normalize, small.queries)))
+    return sorted(extra.items(), key=lambda item: -item[1])
+
+
+def violations(name, budget, small, large):
+    """Список нарушений бюджета для одной страницы; пустой — всё в порядке."""
+    problems = []
+    for label, sample in (('мало', small), ('много', large)):
+        if sample.status >= 400:
+            problems.append(f'{name} ({label} данных): ответ {sample.status}')
+        if len(sample.queries) > budget.queries:
+            problems.append(
+                f'{name} ({label} данных): {len(sample.queries)} запросов '
+                f'при бюджете {budget.queries}:\n'
+                + '\n'.join(f'    {sql}' for sql in sample.queries))
+        if sample.size > budget.bytes:
+            problems.append(
+                f'{name} ({label} данных): {sample.size} байт '
+                f'при бюджете {budget.bytes}')
+    extra = grown(small, large)
+    if len(large.queries) > len(small.queries) and extra:
+        problems.append(
+            f'{name}: число запросов растёт с данными '
+            f'({len(small.queries)} → {len(large.queries)}):\n'
+            + '\n'.join(f'    +{count} × {sql}' for sql, count in extra))
+    return problems
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Post
+
+
+def read(response):
+    assert response.streaming, 'Списки должны отдаваться потоком'
+    return json.loads(b''.join(response.streaming_content))
+
+
+class TestFeedApi:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_walks_whole_feed(self, client, user):
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 10, 'fields': 'id,text'}
+            if cursor:
+                params['cursor'] = cursor
+            data = read(client.get('/api/posts/', params))
+            assert all(set(row) == {'id', 'text'} for row in data['results'])
+            seen += [row['text'] for row in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        assert seen == [f'Пост {i}' for i in reversed(range(25))], \
+            'Курсор должен пройти ленту целиком, без пропусков и повторов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_single_query_per_page(self, client, post_with_group):
+        with CaptureQueriesContext(connection) as context:
+            data = read(client.get('/api/posts/'))
+        assert len(context.captured_queries) == 1, \
+            'Страница ленты должна читаться одним запросом'
+        assert data['results'][0]['author'] == post_with_group.author.username
+        assert data['results'][0]['group'] == post_with_group.group.slug
+
+    @pytest.mark.django_db(transaction=True)
+    def test_errors_are_json(self, client, post):
+        assert client.get('/api/group/nope/').status_code == 404
+        response = client.get('/api/posts/', {'fields': 'secret'})
+        assert response.status_code == 400
+        response = client.get('/api/follow/')
+        assert response.status_code == 401
+        assert 'detail' in json.loads(response.content)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_malformed_cursor_rejected(self, client, post):
+        response = client.get('/api/posts/', {'cursor': 'не-курсор'})
+        assert response.status_code == 400, \
+            'Битый курсор не должен молча отдавать первую страницу'
+        assert 'detail' in json.loads(response.content)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_and_comments(self, client, user, post):
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        data = json.loads(client.get(f'/api/posts/{post.id}/').content)
+        assert data['text'] == post.text
+        assert data['comment_count'] == 1
+        comments = read(client.get(f'/api/posts/{post.id}/comments/'))
+        assert comments['results'][0]['text'] == 'Коммент'
@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from yatube.cache import CULL_CHECK_EVERY, SQLiteCache
+
+
+def make_cache(path, **options):
+    return SQLiteCache(str(path), {'OPTIONS': options})
+
+
+def add_many(path, times):
+    cache = make_cache(path)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class TestSQLiteCache:
+
+    def test_basic_operations(self, tmp_path):
+        cache = make_cache(tmp_path / 'cache.sqlite3')
+        cache.set('a', {'x': 1})
+        assert cache.get('a') == {'x': 1}
+        assert cache.get('missing', 'default') == 'default'
+        assert not cache.add('a', 'other')
+        assert cache.add('b', 2)
+
+        cache.set_many({'c': 3, 'd': 4})
+        assert cache.get_many(['a', 'c', 'd', 'missing']) == {
+            'a': {'x': 1}, 'c': 3, 'd': 4}
+        cache.delete_many(['c', 'd'])
+        assert cache.get_many(['c', 'd']) == {}
+
+        assert cache.incr('b', 5) == 7
+        with pytest.raises(ValueError):
+            cache.incr('missing')
+
+        cache.set('gone', 1, timeout=-1)
+        assert cache.get('gone') is None
+
+    def test_workers_share_data(self, tmp_path):
+        path = tmp_path / 'cache.sqlite3'
+        first, second = make_cache(path), make_cache(path)
+        first.set('version', 1)
+        second.incr('version')
+        assert first.get('version') == 2, \
+            'Изменения в одном процессе должны быть видны другим'
+
+    def test_incr_is_atomic_across_processes(self, tmp_path):
+        path = tmp_path / 'cache.sqlite3'
+        make_cache(path).set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=add_many, args=(path, 50))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert make_cache(path).get('counter') == 200
+
+    def test_size_bounded_lru(self, tmp_path):
+        # Доля сверх MAX_ENTRIES здесь 101 // 1000 == 0 записей.
+        cache = make_cache(tmp_path / 'cache.sqlite3', MAX_ENTRIES=10,
+                           CULL_FREQUENCY=1000)
+        cache.set('hot', 'value')
+        cache._db.execute("UPDATE cache SET accessed = 1e12 WHERE key LIKE "
+                          "'%hot'")
+        cache.set_many({f'key{i}': i for i in range(CULL_CHECK_EVERY)})
+        count = cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        assert count == 10, 'Кеш должен вытеснять записи сверх MAX_ENTRIES'
+        assert cache.get('hot') == 'value', \
+            'Недавно прочитанные ключи должны вытесняться последними'
+
+    def test_zero_cull_frequency_clears(self, tmp_path):
+        cache = make_cache(tmp_path / 'cache.sqlite3', MAX_ENTRIES=10,
+                           CULL_FREQUENCY=0)
+        cache.set_many({f'key{i}': i for i in range(CULL_CHECK_EVERY)})
+        count = cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        assert count == 0, 'CULL_FREQUENCY=0 должен очищать кеш целиком'
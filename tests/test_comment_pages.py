@@ -0,0 +1,59 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment
+from posts.pagination import COMMENT_PAGE_SIZE
+
+
+def add_comments(post, author, count, start=0):
+    for i in range(start, start + count):
+        Comment.objects.create(post=post, author=author, text=f'Коммент {i}')
+
+
+class TestCommentPages:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_query_count_independent_of_comments(self, user_client, user,
+                                                 post):
+        url = f'/{user.username}/{post.id}/'
+        add_comments(post, user, 1)
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        few = len(context.captured_queries)
+
+        add_comments(post, user, 20, start=1)
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        assert len(context.captured_queries) == few, \
+            'Авторы комментариев должны загружаться тем же запросом'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more(self, user_client, user, post):
+        add_comments(post, user, COMMENT_PAGE_SIZE + 5)
+        url = f'/{user.username}/{post.id}/'
+        response = user_client.get(url)
+        items = response.context['items']
+        assert [c.text for c in items][:2] == ['Коммент 0', 'Коммент 1'], \
+            'Комментарии должны идти по времени создания'
+        assert len(items) == COMMENT_PAGE_SIZE
+        assert items.next_cursor, 'Нужна ссылка «Показать ещё»'
+        content = response.content.decode()
+        assert 'data-more=' in content and 'dataset.more' in content, \
+            'Кнопка «Показать ещё» должна догружать комментарии скриптом'
+        assert 'comments' not in response.context, \
+            'Странице поста нужна только страница комментариев'
+
+        response = user_client.get(
+            f'{url}comments/', {'cursor': items.next_cursor})
+        assert response.status_code == 200
+        more = [c.text for c in response.context['items']]
+        assert more[0] == f'Коммент {COMMENT_PAGE_SIZE}'
+        assert len(more) == 5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_empty_comment_rejected(self, user_client, user, post):
+        user_client.post(f'/{user.username}/{post.id}/comment/',
+                         {'text': ''})
+        assert not Comment.objects.filter(post=post).exists(), \
+            'Пустой комментарий не должен сохраняться'
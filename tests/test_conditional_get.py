@@ -0,0 +1,58 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Post
+
+
+class TestConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_not_modified(self, client, post):
+        etag = client.get('/')['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, \
+            'Неизменившаяся лента должна отвечать 304'
+        assert not any('posts_post' in query['sql']
+                       for query in context.captured_queries), \
+            'Ответ 304 не должен запрашивать посты'
+
+        Post.objects.create(text='Новый пост', author=post.author)
+        response = client.get('/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Новый пост должен менять ETag ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_changes_on_comment(self, user_client, user, post):
+        url = f'/{user.username}/{post.id}/'
+        etag = user_client.get(url)['ETag']
+        assert user_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Комментарий должен менять ETag страницы поста'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_ignores_if_modified_since(self, client, user, post):
+        url = f'/{user.username}/{post.id}/'
+        response = client.get(url)
+        assert 'Last-Modified' not in response
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        assert response.status_code == 200, \
+            'Страница поста зависит от зрителя, 304 только по ETag'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_viewer_in_etag(self, user_client, user):
+        url = f'/{user.username}/'
+        user_client.get(url)
+        anonymous = Client().get(url)['ETag']
+        assert Client().get(
+            url, HTTP_IF_NONE_MATCH=anonymous).status_code == 304
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=anonymous)
+        assert response.status_code == 200, \
+            'ETag должен различаться для разных зрителей'
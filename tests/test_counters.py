@@ -0,0 +1,74 @@
+import pytest
+from django.core.management import call_command
+
+from posts.counters import stats_for
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user_client, user,
+                                    django_user_model):
+        author = django_user_model.objects.create_user(username='Counted')
+        post = Post.objects.create(text='Пост', author=author)
+        user_client.get(f'/{author.username}/follow/')
+        user_client.post(f'/{author.username}/{post.id}/comment/',
+                         {'text': 'Комментарий'})
+
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Проверьте, что добавление комментария увеличивает счётчик'
+        author_stats = UserStats.objects.get(user=author)
+        assert author_stats.posts_count == 1
+        assert author_stats.followers_count == 1
+        assert UserStats.objects.get(user=user).following_count == 1
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert UserStats.objects.get(user=author).followers_count == 0
+        assert UserStats.objects.get(user=user).following_count == 0
+
+        response = user_client.get(f'/{author.username}/')
+        assert response.context['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cascade_delete_keeps_counters(self, user, django_user_model):
+        author = django_user_model.objects.create_user(username='Deleted')
+        post = Post.objects.create(text='Пост', author=user)
+        Comment.objects.create(post=post, author=author, text='Коммент')
+        Follow.objects.create(user=author, author=user)
+
+        author.delete()
+        post.refresh_from_db()
+        assert post.comment_count == 0
+        assert UserStats.objects.get(user=user).followers_count == 0
+
+        post.delete()
+        assert UserStats.objects.get(user=user).posts_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_decrement_clamped_at_zero(self, user, post):
+        comment = Comment.objects.create(post=post, author=user,
+                                         text='Коммент')
+        # Счётчики уже разошлись с данными.
+        Post.objects.update(comment_count=0)
+        UserStats.objects.filter(user=user).update(posts_count=0)
+
+        comment.delete()
+        post.refresh_from_db()
+        assert post.comment_count == 0, \
+            'Уменьшение не должно уводить счётчик ниже нуля'
+        post.delete()
+        assert UserStats.objects.get(user=user).posts_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recount_repairs_drift(self, user, post):
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        Post.objects.update(comment_count=42)
+        UserStats.objects.filter(user=user).update(posts_count=0)
+
+        call_command('recount_counters')
+        post.refresh_from_db()
+        assert post.comment_count == 1, \
+            'Команда `recount_counters` должна чинить счётчик комментариев'
+        assert stats_for(user).posts_count == 1
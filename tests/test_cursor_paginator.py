@@ -0,0 +1,85 @@
+import base64
+import json
+
+import pytest
+
+from posts.models import Post
+from posts.pagination import (
+    CursorPaginator, CURSOR_AFTER_PAGE, PAGE_SIZE, POST_ORDERING,
+    decode_cursor, InvalidCursor,
+)
+
+
+@pytest.fixture
+def many_posts(user):
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author=user) for i in range(25)
+    )
+    return list(Post.objects.order_by(*POST_ORDERING))
+
+
+class TestCursorPaginator:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_walk_forward_and_back(self, many_posts):
+        paginator = CursorPaginator(Post.objects.all(), PAGE_SIZE)
+
+        first = paginator.page()
+        assert list(first) == many_posts[:10], \
+            'Первая страница курсорной выдачи должна совпадать с началом ленты'
+        assert not first.has_previous()
+
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        assert list(second) == many_posts[10:20]
+        assert list(third) == many_posts[20:]
+        assert not third.has_next()
+
+        back = paginator.page(third.previous_cursor)
+        assert list(back) == many_posts[10:20], \
+            'Ссылка «Предыдущая» должна возвращать на предыдущую страницу'
+        assert list(paginator.page(back.previous_cursor)) == many_posts[:10]
+
+    def test_bad_cursor(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor('не-курсор')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_oversized_pk_rejected(self, client, user, post):
+        raw = json.dumps(['n', '2026-01-01T00:00:00+00:00', 10 ** 30])
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor)
+
+        for url in ('/', f'/{user.username}/'):
+            assert client.get(url, {'cursor': cursor}).status_code == 200, \
+                'Курсор с огромным id должен открывать первую страницу'
+        response = client.get('/api/posts/', {'cursor': cursor})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_accept_cursor(self, client, many_posts):
+        first = CursorPaginator(Post.objects.all(), PAGE_SIZE).page()
+        response = client.get('/', {'cursor': first.next_cursor})
+        assert response.status_code == 200
+        assert list(response.context['page']) == many_posts[10:20], \
+            'Главная страница должна понимать параметр `cursor`'
+
+        author = many_posts[0].author.username
+        response = client.get(f'/{author}/', {'cursor': 'мусор'})
+        assert response.status_code == 200, \
+            'Неверный курсор должен открывать первую страницу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_deep_page_links_switch_to_cursor(self, client, user):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=user)
+            for i in range(PAGE_SIZE * (CURSOR_AFTER_PAGE + 1))
+        )
+        response = client.get('/', {'page': CURSOR_AFTER_PAGE})
+        page = response.context['page']
+        assert page.next_cursor, \
+            'Глубокие номерные страницы должны ссылаться дальше по курсору'
+        direction, _, pk = decode_cursor(page.next_cursor)
+        assert pk == page[len(page) - 1].pk
+        assert f'?cursor={page.next_cursor}' in response.content.decode()
@@ -0,0 +1,48 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+
+from posts.models import Comment, Follow, Post, TimelineEntry, UserStats
+
+
+def sizes():
+    return {'users': 30, 'groups': 3, 'posts': 120, 'comments': 200,
+            'follows_per_user': 5, 'images': 2, 'image_share': 0.5,
+            'seed': 7}
+
+
+class TestGenerateDataset:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generates_consistent_data(self):
+        call_command('generate_dataset', *(
+            f'--{name.replace("_", "-")}={value}'
+            for name, value in sizes().items()))
+        assert Post.objects.count() == 120
+        assert Comment.objects.count() == 200
+        assert Post.objects.exclude(image='').exclude(image=None).values(
+            'image').distinct().count() <= 2, \
+            'Картинки должны браться из маленького пула'
+
+        stats = UserStats.objects.aggregate(
+            posts=Sum('posts_count'), followers=Sum('followers_count'))
+        assert stats['posts'] == 120, \
+            'После генерации счётчики должны быть пересчитаны'
+        assert stats['followers'] == Follow.objects.count()
+        assert TimelineEntry.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_seed_is_reproducible(self):
+        from posts.dataset import Generator
+
+        def shape():
+            Generator(**sizes()).run()
+            first = Post.objects.order_by('pk').values_list(
+                'author_id', flat=True).first()
+            rows = list(Post.objects.order_by('pk').values_list(
+                'author_id', 'group_id'))
+            Post.objects.all().delete()
+            return [author - first for author, _ in rows]
+
+        assert shape() == shape(), \
+            'Одинаковый seed должен давать одинаковые данные'
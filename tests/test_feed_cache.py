@@ -0,0 +1,38 @@
+import pytest
+
+from posts.models import Post
+
+
+class TestFeedCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_is_page_aware(self, client, user):
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {i}', author=user) for i in range(11))
+        first = client.get('/').content.decode()
+        second = client.get('/', {'page': 2}).content.decode()
+        assert 'Пост номер 0' in second and 'Пост номер 0' not in first, \
+            'Кеш главной страницы должен учитывать номер страницы'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_invalidates_feeds(self, user_client, post_with_group):
+        urls = ('/', f'/group/{post_with_group.group.slug}/',
+                f'/{post_with_group.author.username}/')
+        for url in urls:
+            content = user_client.get(url).content.decode()
+            assert post_with_group.text in content
+
+        user_client.post(
+            f'/{post_with_group.author.username}/{post_with_group.id}/edit/',
+            {'text': 'Исправленный текст', 'group': post_with_group.group_id},
+        )
+        for url in urls:
+            content = user_client.get(url).content.decode()
+            assert 'Исправленный текст' in content, \
+                f'Редактирование поста должно сбрасывать кеш ленты `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_invalidates_index(self, user_client):
+        user_client.get('/')
+        user_client.post('/new/', {'text': 'Совсем новый пост'})
+        assert 'Совсем новый пост' in user_client.get('/').content.decode()
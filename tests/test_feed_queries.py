@@ -0,0 +1,49 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def add_posts(author, group, count):
+    for i in range(count):
+        post = Post.objects.create(text=f'Пост {i}', author=author,
+                                   group=group)
+        Comment.objects.create(post=post, author=author, text='Коммент')
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context)
+
+
+class TestFeedQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_queries_do_not_grow(self, settings, user_client, user,
+                                      group, django_user_model):
+        settings.CACHES = DUMMY_CACHE
+        author = django_user_model.objects.create_user(username='FeedAuthor')
+        Follow.objects.create(user=user, author=author)
+        urls = ('/', f'/group/{group.slug}/', f'/{author.username}/',
+                '/follow/')
+
+        add_posts(author, group, 1)
+        small = {url: count_queries(user_client, url) for url in urls}
+        add_posts(author, group, 9)
+        for url in urls:
+            assert count_queries(user_client, url) == small[url], \
+                f'Число запросов на странице `{url}` растёт с числом постов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_count_annotation(self, user, post):
+        Comment.objects.create(post=post, author=user, text='Раз')
+        Comment.objects.create(post=post, author=user, text='Два')
+        assert Post.objects.feed().get(pk=post.pk).comment_count == 2
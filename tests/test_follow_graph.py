@@ -0,0 +1,63 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from posts import follow_graph
+from posts.models import Follow, UserStats
+
+
+class TestFollowGraph:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_is_idempotent(self, user_client, user, django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        user_client.get('/Author/follow/')
+        user_client.get('/Author/follow/')
+        assert Follow.objects.filter(user=user, author=author).count() == 1, \
+            'Повторная подписка не должна создавать вторую запись'
+        assert UserStats.objects.get(user=author).followers_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_button_reflects_viewer(self, user_client, user,
+                                    django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        other = django_user_model.objects.create_user(username='Other')
+        Follow.objects.create(user=other, author=author)
+
+        response = user_client.get('/Author/')
+        assert response.context['is_following'] is False, \
+            'Кнопка должна зависеть от подписки зрителя, а не от чужих'
+
+        user_client.get('/Author/follow/')
+        assert user_client.get('/Author/').context['is_following'] is True
+
+        user_client.get('/Author/unfollow/')
+        assert user_client.get('/Author/').context['is_following'] is False
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sets_cached(self, user, django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        follow_graph.follow(user.pk, author.pk)
+        assert follow_graph.followers(author.pk) == {user.pk}
+        with CaptureQueriesContext(connection) as context:
+            assert follow_graph.is_following(user.pk, author.pk)
+            assert follow_graph.is_following(user.pk, author.pk)
+        assert len(context.captured_queries) <= 1, \
+            'Множество подписок должно читаться из кеша'
+
+        follow_graph.unfollow(user.pk, author.pk)
+        assert not follow_graph.is_following(user.pk, author.pk)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_forgotten_after_commit(self, user, django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        assert not follow_graph.is_following(user.pk, author.pk)
+        stale = cache.get(follow_graph._key(follow_graph.FOLLOWEES, user.pk))
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+            # Параллельный запрос до коммита ещё видит старое множество.
+            cache.set(follow_graph._key(follow_graph.FOLLOWEES, user.pk),
+                      stale)
+        assert follow_graph.is_following(user.pk, author.pk), \
+            'Множество подписок должно сбрасываться после коммита'
@@ -0,0 +1,99 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from posts.models import Post
+
+
+def upload(name, size, fmt='JPEG', **save_kwargs):
+    file_obj = BytesIO()
+    Image.new('RGB', size=size, color=(200, 30, 30)).save(
+        file_obj, fmt, **save_kwargs)
+    return SimpleUploadedFile(name, file_obj.getvalue())
+
+
+def exif_with_gps():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'  # Make
+    exif[0x8825] = {2: (55, 45, 0)}  # GPSInfo
+    return exif.tobytes()
+
+
+class TestImageIngest:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_large_image_downscaled(self, user_client, settings):
+        settings.POST_IMAGE_MAX_EDGE = 800
+        original = upload('camera.jpg', (3200, 1600), exif=exif_with_gps())
+        user_client.post('/new/', {'text': 'Большое фото', 'image': original})
+
+        post = Post.objects.get(text='Большое фото')
+        with Image.open(post.image.path) as stored:
+            assert stored.size == (800, 400), \
+                'Картинка больше лимита должна уменьшаться по длинной стороне'
+            assert not stored.getexif(), \
+                'Метаданные оригинала не должны сохраняться'
+        assert post.image.size < original.size
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rotated_photo_keeps_proportions(self, user_client, settings):
+        settings.POST_IMAGE_MAX_EDGE = 800
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой
+        original = upload('portrait.jpg', (1600, 800), exif=exif.tobytes())
+        user_client.post('/new/', {'text': 'Портрет', 'image': original})
+
+        post = Post.objects.get(text='Портрет')
+        with Image.open(post.image.path) as stored:
+            assert stored.size == (400, 800), \
+                'Снимок с поворотом в EXIF должен уменьшаться уже повёрнутым'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_too_many_pixels_rejected(self, user_client, settings):
+        settings.POST_IMAGE_MAX_PIXELS = 100 * 100
+        response = user_client.post('/new/', {
+            'text': 'Бомба', 'image': upload('bomb.png', (200, 200), 'PNG'),
+        })
+        assert response.status_code == 200
+        assert 'image' in response.context['form'].errors, \
+            'Картинка сверх лимита пикселей должна отклоняться формой'
+        assert not Post.objects.filter(text='Бомба').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_too_many_bytes_rejected(self, user_client, settings):
+        settings.POST_IMAGE_MAX_BYTES = 100
+        response = user_client.post('/new/', {
+            'text': 'Тяжёлый файл',
+            'image': upload('heavy.png', (300, 300), 'PNG'),
+        })
+        assert 'image' in response.context['form'].errors, \
+            'Файл сверх лимита байт должен отклоняться формой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_truncated_jpeg_rejected(self, user_client):
+        content = upload('cut.jpg', (400, 400), quality=95).read()
+        truncated = SimpleUploadedFile('cut.jpg', content[:len(content) // 2])
+        response = user_client.post('/new/', {'text': 'Обрезанный',
+                                              'image': truncated})
+        assert response.status_code == 200, \
+            'Битая картинка — ошибка формы, а не 500'
+        assert 'image' in response.context['form'].errors
+        assert not Post.objects.filter(text='Обрезанный').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cmyk_tiff_converted(self, user_client):
+        file_obj = BytesIO()
+        Image.new('CMYK', size=(100, 50), color=(0, 200, 200, 0)).save(
+            file_obj, 'TIFF')
+        user_client.post('/new/', {
+            'text': 'CMYK',
+            'image': SimpleUploadedFile('print.tiff', file_obj.getvalue()),
+        })
+
+        post = Post.objects.get(text='CMYK')
+        with Image.open(post.image.path) as stored:
+            assert stored.format == 'PNG'
+            assert stored.mode == 'RGB', \
+                'Режимы, которых нет в PNG, должны переводиться в RGB'
@@ -0,0 +1,71 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from posts import thumbnails
+from posts.models import Post, StoredImage
+
+
+def upload(name, color):
+    file_obj = BytesIO()
+    Image.new('RGB', size=(400, 200), color=color).save(file_obj, 'png')
+    return SimpleUploadedFile(name, file_obj.getvalue())
+
+
+class TestContentAddressedStorage:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_duplicates_stored_once(self, user_client, user):
+        user_client.post('/new/', {'text': 'Мем 1',
+                                   'image': upload('meme.png', (1, 2, 3))})
+        user_client.post('/new/', {'text': 'Мем 2',
+                                   'image': upload('copy.png', (1, 2, 3))})
+        first, second = Post.objects.filter(text__startswith='Мем')
+        assert first.image.name == second.image.name, \
+            'Одинаковые картинки должны получать одно имя файла'
+        assert first.image.name.startswith('posts/')
+        assert StoredImage.objects.get(name=first.image.name).refs == 2, \
+            'Каждый пост с картинкой должен учитываться в счётчике ссылок'
+
+        storage = first.image.storage
+        thumbnail = thumbnails.ready_thumbnail(first.image)
+        first.delete()
+        assert storage.exists(second.image.name), \
+            'Файл удаляется, только когда на него не ссылается ни один пост'
+        assert StoredImage.objects.get(name=second.image.name).refs == 1
+
+        second.delete()
+        assert not storage.exists(second.image.name), \
+            'Файл без ссылок должен удаляться'
+        assert not StoredImage.objects.filter(name=second.image.name).exists()
+        assert not thumbnail.storage.exists(thumbnail.name), \
+            'Вместе с файлом должны удаляться его миниатюры'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_replaced_image_released(self, user_client, user):
+        user_client.post('/new/', {'text': 'Пост',
+                                   'image': upload('old.png', (9, 9, 9))})
+        post = Post.objects.get(text='Пост')
+        old_name = post.image.name
+
+        user_client.post(f'/{user.username}/{post.id}/edit/', {
+            'text': 'Пост', 'image': upload('new.png', (7, 7, 7)),
+        })
+        post.refresh_from_db()
+        assert post.image.name != old_name
+        assert not post.image.storage.exists(old_name), \
+            'Заменённая картинка без других ссылок должна удаляться'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recount_restores_refs(self, user_client, user):
+        user_client.post('/new/', {'text': 'Пост',
+                                   'image': upload('kept.png', (5, 5, 5))})
+        post = Post.objects.get(text='Пост')
+        StoredImage.objects.filter(name=post.image.name).delete()
+
+        call_command('recount_counters')
+        assert StoredImage.objects.get(name=post.image.name).refs == 1, \
+            'Команда `recount_counters` должна пересчитывать ссылки на файлы'
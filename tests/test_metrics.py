@@ -0,0 +1,39 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class TestMetrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing(self, user_client, user, post):
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(f'/{user.username}/')
+        timing = response['Server-Timing']
+        queries = re.search(r'sql;dur=[\d.]+;desc="(\d+) queries"', timing)
+        assert queries, 'В Server-Timing должно быть время SQL'
+        assert int(queries.group(1)) == len(context.captured_queries), \
+            'Число запросов в Server-Timing должно совпадать с реальным'
+        assert re.search(r'tpl;dur=[\d.]+', timing)
+        assert 'cache;desc="hits=' in timing
+        assert 'total;dur=' in timing
+
+    @pytest.mark.django_db(transaction=True)
+    def test_metrics_endpoint(self, client, post):
+        client.get('/')
+        client.get('/')
+        body = client.get('/metrics').content.decode()
+        count = re.search(
+            r'yatube_request_duration_seconds_count\{view="index"\} (\d+)',
+            body)
+        assert count and int(count.group(1)) >= 2, \
+            'Запросы должны агрегироваться по имени URL'
+        assert ('yatube_request_duration_seconds_bucket'
+                '{view="index",le="+Inf"}') in body
+        assert 'yatube_cache_hits_total{view="index"}' in body
+
+    def test_metrics_hidden_from_others(self, client):
+        response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 404
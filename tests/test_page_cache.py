@@ -0,0 +1,64 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Follow
+
+
+class TestAnonymousPageCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_repeat_request_served_from_cache(self, client, post):
+        client.get('/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/')
+        assert response.status_code == 200
+        assert post.text in response.content.decode()
+        assert len(context.captured_queries) == 0, \
+            'Повторный анонимный запрос должен отдаваться из кеша страниц'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_purges_post_page(self, user_client, user, post):
+        url = f'/{user.username}/{post.id}/'
+        anonymous = Client()
+        anonymous.get(url)
+        user_client.post(f'{url}comment/', {'text': 'Свежий комментарий'})
+        assert 'Свежий комментарий' in anonymous.get(url).content.decode(), \
+            'Комментарий должен сбрасывать кеш страницы поста'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_purges_profile(self, user_client, user,
+                                   django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        anonymous = Client()
+        anonymous.get('/Author/')
+        assert anonymous.get('/Author/').context is None
+        Follow.objects.create(user=user, author=author)
+        response = anonymous.get('/Author/')
+        assert response.context is not None, \
+            'Подписка должна сбрасывать кеш профиля автора'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authenticated_bypass(self, user_client, user):
+        Client().get('/')
+        response = user_client.get('/')
+        assert response.context is not None, \
+            'Залогиненным пользователям страница должна рендериться заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unknown_query_params_share_entry(self, client, post):
+        client.get('/')
+        with CaptureQueriesContext(connection) as context:
+            client.get('/', {'x': 42})
+        assert len(context.captured_queries) == 0, \
+            'Посторонние параметры не должны заводить новую запись кеша'
+        assert client.get('/', {'page': 2}).status_code in (200, 404)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pending_messages_bypass(self, client, post):
+        client.get('/')
+        client.cookies['messages'] = 'pending'
+        response = client.get('/')
+        assert response.context is not None, \
+            'С cookie сообщений страница должна собираться заново'
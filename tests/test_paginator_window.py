@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+from posts.pagination import page_window
+
+
+class TestPageWindow:
+
+    def test_window(self):
+        assert page_window(1, 1) == [1]
+        assert page_window(1, 500) == [1, 2, 3, None, 500]
+        assert page_window(250, 500) == [1, None, 248, 249, 250, 251, 252,
+                                         None, 500]
+        assert page_window(4, 6) == [1, 2, 3, 4, 5, 6]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paginator_renders_window(self, client, user):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=user) for i in range(300))
+        response = client.get('/', {'page': 15})
+        content = response.content.decode()
+        assert content.count("class='page-link'") < 15, \
+            'Паджинатор должен показывать только окно из номеров страниц'
+        assert '?page=30' in content and '?page=1' in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_count_is_cached(self, client, post_with_group):
+        url = f'/group/{post_with_group.group.slug}/'
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        assert not any('COUNT(' in query['sql'] for query in context), \
+            'Число постов ленты должно браться из кеша'
+
+        Post.objects.create(text='Ещё пост', author=post_with_group.author,
+                            group=post_with_group.group)
+        assert client.get(url).context['paginator'].count == 2, \
+            'Новый пост должен сразу учитываться в числе постов ленты'
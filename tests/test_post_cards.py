@@ -0,0 +1,73 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from posts import cards, feed_cache
+from posts.models import Comment, Post
+
+CARD_TEMPLATE = 'posts/post_item.html'
+
+
+def rendered_cards(client, url):
+    # Версия ленты поднимается, чтобы фрагмент ленты собирался заново и
+    # брал карточки из их собственного кеша.
+    feed_cache.bump(feed_cache.INDEX)
+    response = client.get(url)
+    rendered = [template.name for template in response.templates]
+    return response.content.decode(), rendered.count(CARD_TEMPLATE)
+
+
+class TestPostCards:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_reuses_cached_cards(self, user_client, post_with_group):
+        Post.objects.filter(pk=post_with_group.pk).update(image='')
+        _, first = rendered_cards(user_client, '/')
+        assert first == 1
+        _, second = rendered_cards(user_client, '/')
+        assert second == 0, 'Карточка должна браться из кеша'
+        post = Post.objects.get(pk=post_with_group.pk)
+        assert cache.get(cards.card_key(post, own=True))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_and_comment_change_key(self, user_client, user, group):
+        post = Post.objects.create(text='Старый текст', author=user,
+                                   group=group)
+        rendered_cards(user_client, '/')
+
+        post.text = 'Новый текст'
+        post.save()
+        content, _ = rendered_cards(user_client, '/')
+        assert 'Новый текст' in content, 'Правка должна менять карточку'
+
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        content, count = rendered_cards(user_client, '/')
+        assert count == 1 and '1 комментариев' in content, \
+            'Комментарий должен менять карточку'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_and_author_changes(self, user_client, user, group):
+        Post.objects.create(text='Пост', author=user, group=group)
+        anonymous = Client()
+        anonymous.get('/')
+
+        group.title = 'Переименованная группа'
+        group.save()
+        assert 'Переименованная группа' in anonymous.get(
+            '/').content.decode(), 'Правка группы должна менять карточки'
+
+        user.username = 'Renamed'
+        user.save()
+        content = anonymous.get('/').content.decode()
+        assert '@Renamed' in content and '/Renamed/' in content, \
+            'Смена имени автора должна менять карточки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_button_only_for_author(self, user_client, user, post):
+        Post.objects.filter(pk=post.pk).update(image='')
+        rendered_cards(user_client, '/')
+        content, _ = rendered_cards(Client(), '/')
+        assert 'Редактировать' not in content, \
+            'Карточка автора не должна доставаться другим'
+        content, _ = rendered_cards(user_client, '/')
+        assert 'Редактировать' in content
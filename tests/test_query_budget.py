@@ -0,0 +1,135 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+
+from posts import transfer
+from posts import urls as posts_urls
+from posts.models import Comment, Follow, Post
+from users import urls as users_urls
+
+from .query_budget import Budget, measure, violations
+
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+SMALL = 10
+LARGE = 10000
+
+# Бюджет на страницу при холодном кеше. Запросы — ровно по замеру:
+# новый запрос должен появляться осознанно, вместе с правкой бюджета.
+BUDGETS = {
+    'index': Budget(queries=5, bytes=24000),
+    'group': Budget(queries=5, bytes=28000),
+    'new_post': Budget(queries=3, bytes=5000),
+    'follow_index': Budget(queries=6, bytes=24000),
+    'search': Budget(queries=4, bytes=24000),
+    'profile': Budget(queries=7, bytes=26000),
+    'post': Budget(queries=8, bytes=26000),
+    'post_edit': Budget(queries=5, bytes=5000),
+    # BEGIN: комментарий и счётчик поста пишутся одной транзакцией.
+    'add_comment': Budget(queries=7, bytes=0),
+    'post_comments': Budget(queries=4, bytes=20000),
+    'profile_follow': Budget(queries=10, bytes=0),
+    # COUNT подписчиков: не опустился ли автор ниже порога fan-out.
+    'profile_unfollow': Budget(queries=11, bytes=0),
+    'signup': Budget(queries=0, bytes=10000),
+}
+
+
+def url_names(*modules):
+    return {pattern.name for module in modules
+            for pattern in module.urlpatterns}
+
+
+def image_name():
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), 'teal').save(buffer, 'JPEG')
+    storage = Post._meta.get_field('image').storage
+    return storage.save('posts/budget.jpg', ContentFile(buffer.getvalue()))
+
+
+def add_data(author, commenter, group, post, image, count):
+    """Ещё `count` постов автора, половина с картинкой, и комментарии."""
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author=author,
+             group=group if i % 2 else None,
+             image=image if i % 2 else '')
+        for i in range(count))
+    Comment.objects.bulk_create(
+        Comment(post=post, author=commenter, text=f'Комментарий {i}')
+        for i in range(count))
+    # Счётчики, поисковый индекс и ленты подписок, как после импорта.
+    transfer.finish_import()
+
+
+class TestQueryBudget:
+
+    def test_every_url_has_budget(self):
+        assert url_names(posts_urls, users_urls) == set(BUDGETS), \
+            'У каждой страницы из posts.urls и users.urls должен быть бюджет'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_queries_within_budget(self, settings, user, group,
+                                   django_user_model):
+        settings.CACHES = DUMMY_CACHE
+        author = django_user_model.objects.create_user(username='Budget')
+        other = django_user_model.objects.create_user(username='Other')
+        Follow.objects.create(user=user, author=author)
+        image = image_name()
+        post = Post.objects.create(text='Пост с обсуждением', author=author,
+                                   group=group, image=image)
+
+        reader, writer = Client(), Client()
+        reader.force_login(user)
+        writer.force_login(author)
+        post_args = [author.username, post.id]
+        cases = {
+            'index': (reader, 'get', reverse('index'), None),
+            'group': (reader, 'get', reverse('group', args=[group.slug]),
+                      None),
+            'new_post': (writer, 'get', reverse('new_post'), None),
+            'follow_index': (reader, 'get', reverse('follow_index'), None),
+            'search': (reader, 'get', reverse('search'), {'q': 'пост'}),
+            'profile': (reader, 'get',
+                        reverse('profile', args=[author.username]), None),
+            'post': (reader, 'get', reverse('post', args=post_args), None),
+            'post_edit': (writer, 'get', reverse('post_edit', args=post_args),
+                          None),
+            'add_comment': (reader, 'post',
+                            reverse('add_comment', args=post_args),
+                            {'text': 'Ещё комментарий'}),
+            'post_comments': (reader, 'get',
+                              reverse('post_comments', args=post_args), None),
+            # Подписка и отписка идут парой, чтобы данные не менялись.
+            'profile_follow': (reader, 'get',
+                               reverse('profile_follow',
+                                       args=[other.username]), None),
+            'profile_unfollow': (reader, 'get',
+                                 reverse('profile_unfollow',
+                                         args=[other.username]), None),
+            'signup': (Client(), 'get', reverse('signup'), None),
+        }
+
+        def measure_all():
+            # Первый проход прогревает то, что создаётся один раз:
+            # миниатюры, счётчики пользователей, сессии.
+            for client, method, url, data in cases.values():
+                measure(client, method, url, data)
+            return {name: measure(*case) for name, case in cases.items()}
+
+        add_data(author, user, group, post, image, SMALL - 1)
+        small = measure_all()
+        add_data(author, user, group, post, image, LARGE - SMALL)
+        large = measure_all()
+
+        problems = [
+            problem for name, budget in BUDGETS.items()
+            for problem in violations(name, budget, small[name], large[name])
+        ]
+        assert not problems, '\n\n'.join(problems)
@@ -0,0 +1,81 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+
+from posts.models import Post
+from yatube.replicas import _pin_key, PinPrimaryMiddleware, ReplicaRouter
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    # Вторая база SQLite рядом с тестовой, как реплика в проде.
+    connections.databases['replica'] = {
+        **connections.databases['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+def feed(client):
+    return client.get('/').content.decode()
+
+
+class TestReplicas:
+
+    def test_noop_without_replicas(self):
+        assert ReplicaRouter().db_for_read(Post) is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_reads_from_replica(self, replica, user):
+        Post.objects.create(text='Уже на реплике', author=user)
+        call_command('sync_replica')
+        Post.objects.create(text='Ещё не на реплике', author=user)
+
+        content = feed(Client())
+        assert 'Уже на реплике' in content
+        assert 'Ещё не на реплике' not in content, \
+            'Лента должна читаться с реплики'
+
+        call_command('sync_replica')
+        assert 'Ещё не на реплике' in feed(Client())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writer_pinned_to_primary(self, replica, user_client, user,
+                                      django_user_model):
+        call_command('sync_replica')
+        user_client.post('/new/', {'text': 'Свежий пост'})
+        assert 'Свежий пост' in feed(user_client), \
+            'Автор должен сразу видеть свою запись'
+
+        reader = Client()
+        reader.force_login(
+            django_user_model.objects.create_user(username='Reader'))
+        assert 'Свежий пост' not in feed(reader), \
+            'Остальные читают с реплики, пока она не обновлена'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_incidental_write_does_not_pin(self, replica, user):
+        def view(request):
+            # Попутная запись, как у сборки миниатюры при чтении.
+            Post.objects.filter(pk=0).update(text='')
+            return HttpResponse()
+
+        middleware = PinPrimaryMiddleware(view)
+        request = RequestFactory().get('/')
+        request.user = user
+        middleware(request)
+        assert not cache.get(_pin_key(user.pk)), \
+            'Запись при GET-чтении не должна закреплять читателя'
+
+        request = RequestFactory().post('/new/')
+        request.user = user
+        middleware(request)
+        assert cache.get(_pin_key(user.pk)), \
+            'Запись из POST закрепляет пользователя за основной базой'
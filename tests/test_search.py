@@ -0,0 +1,52 @@
+import pytest
+
+from posts.admin import PostAdmin
+from posts.models import Post
+from posts.search import rebuild_index, search_posts
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_follows_save_and_delete(self, user):
+        rebuild_index()
+        post = Post.objects.create(text='Война и мир', author=user)
+        assert search_posts('войн')[0] == [post], \
+            'Новый пост должен находиться поиском по началу слова'
+
+        post.text = 'Анна Каренина'
+        post.save()
+        assert search_posts('война')[0] == []
+        assert search_posts('каренина')[0] == [post]
+
+        post.delete()
+        assert search_posts('каренина')[0] == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ranking_and_cursor(self, client, user):
+        rebuild_index()
+        best = Post.objects.create(text='кот кот кот', author=user)
+        for i in range(11):
+            Post.objects.create(text=f'кот и собака номер {i}', author=user)
+        Post.objects.create(text='только собака', author=user)
+
+        response = client.get('/search/', {'q': 'кот'})
+        posts = response.context['posts']
+        assert posts[0] == best, 'Лучшее совпадение должно идти первым'
+        assert len(posts) == 10
+
+        cursor = response.context['next_cursor']
+        rest = client.get('/search/', {'q': 'кот', 'cursor': cursor})
+        assert len(rest.context['posts']) == 2
+        assert not set(posts) & set(rest.context['posts'])
+        assert rest.context['next_cursor'] is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_search_uses_index(self, rf, user):
+        rebuild_index()
+        post = Post.objects.create(text='Толстой', author=user)
+        Post.objects.create(text='Чехов', author=user)
+        admin = PostAdmin(Post, None)
+        queryset, distinct = admin.get_search_results(
+            rf.get('/'), Post.objects.all(), 'толстой')
+        assert list(queryset) == [post]
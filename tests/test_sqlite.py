@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from yatube import sqlite
+
+
+def pragma(db, name):
+    return db.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+class TestSQLiteConnection:
+
+    @pytest.mark.django_db
+    def test_django_connection_configured(self):
+        connection.ensure_connection()
+        db = connection.connection
+        assert pragma(db, 'synchronous') == 1, \
+            'Новое соединение должно получать synchronous=NORMAL'
+        assert pragma(db, 'busy_timeout') == 5000
+        assert pragma(db, 'temp_store') == 2
+        assert pragma(db, 'cache_size') == -64 * 1024
+
+    def test_pragmas_configurable(self, settings, tmp_path):
+        settings.SQLITE_PRAGMAS = {'busy_timeout': 250, 'mmap_size': None}
+        db = sqlite3.connect(str(tmp_path / 'db.sqlite3'))
+        sqlite.apply_pragmas(db, sqlite.pragmas())
+        assert pragma(db, 'journal_mode') == 'wal'
+        assert pragma(db, 'busy_timeout') == 250, \
+            'Значения из SQLITE_PRAGMAS должны перекрывать умолчания'
+        assert pragma(db, 'mmap_size') == 0, 'None должен отключать прагму'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_benchmark_command(self, capsys, post):
+        call_command('sqlite_benchmark', '--seconds=0.2', '--readers=2',
+                     '--writers=1')
+        output = capsys.readouterr().out
+        assert 'before' in output and 'after' in output
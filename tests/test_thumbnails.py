@@ -0,0 +1,102 @@
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from django.core.files.base import File
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def image_file(name):
+    file_obj = BytesIO()
+    Image.new('RGB', size=(1200, 600), color=(0, 128, 0)).save(file_obj, 'png')
+    file_obj.seek(0)
+    return File(file_obj, name=name)
+
+
+class TestThumbnails:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_builds_thumbnail(self, user_client, user):
+        user_client.post('/new/', {'text': 'С картинкой',
+                                   'image': image_file('green.png')})
+        post = Post.objects.get(text='С картинкой')
+        thumbnail = thumbnails.ready_thumbnail(post.image)
+        assert thumbnail is not None, \
+            'Миниатюра должна строиться при сохранении поста'
+        assert (thumbnail.width, thumbnail.height) == (960, 339)
+
+        content = user_client.get('/').content.decode()
+        assert thumbnail.url in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_placeholder_until_ready(self, monkeypatch, client, user):
+        queued = []
+        monkeypatch.setattr(thumbnails, 'queue', queued.append)
+        post = Post.objects.create(text='Без миниатюры', author=user,
+                                   image='posts/not-built-yet.png')
+        content = client.get('/').content.decode()
+        assert 'posts/placeholder.svg' in content, \
+            'Пока миниатюры нет, в ленте должна быть заглушка'
+        assert post.image.name in queued, \
+            'Отсутствующая миниатюра должна ставиться в очередь'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_resolved_in_one_lookup(self, client, user):
+        for i in range(10):
+            Post.objects.create(text=f'Пост {i}', author=user,
+                                image=image_file(f'batch{i}.png'))
+        thumbnails.resolved.clear()
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            content = client.get('/').content.decode()
+        kvstore_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        assert len(kvstore_queries) <= 1, \
+            'Миниатюры страницы должны искаться одним запросом'
+        assert 'posts/placeholder.svg' not in content
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get('/')
+        assert not any('thumbnail_kvstore' in query['sql']
+                       for query in context.captured_queries), \
+            'Повторный показ должен брать миниатюры из LRU процесса'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_responsive_variants(self, user_client, user):
+        user_client.post('/new/', {'text': 'Варианты',
+                                   'image': image_file('variants.png')})
+        post = Post.objects.get(text='Варианты')
+        responsive = thumbnails.lookup([post.image])[post.image.name]
+        assert len(responsive.variants) == 6, \
+            'Должны строиться три ширины в исходном формате и в WebP'
+
+        content = user_client.get('/').content.decode()
+        assert "type='image/webp'" in content
+        assert ' 480w' in content and ' 960w' in content, \
+            'В карточке должен быть srcset со всеми ширинами'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_built_thumbnail_replaces_cached_placeholder(
+            self, monkeypatch, client, user):
+        queued = []
+        monkeypatch.setattr(thumbnails, 'queue', queued.append)
+        post = Post.objects.create(text='Позже', author=user,
+                                   image=image_file('later.png'))
+        etag = client.get(f'/{user.username}/{post.pk}/')['ETag']
+        assert 'posts/placeholder.svg' in client.get('/').content.decode()
+
+        monkeypatch.undo()
+        thumbnails.build(post.image.name)
+        content = client.get('/').content.decode()
+        assert 'posts/placeholder.svg' not in content, \
+            'Готовая миниатюра должна сбрасывать закешированную заглушку'
+        assert client.get(f'/{user.username}/{post.pk}/')['ETag'] != etag
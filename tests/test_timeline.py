@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(username='TimelineAuthor')
+
+
+class TestTimeline:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_is_fanned_out(self, user_client, user, author):
+        user_client.get(f'/{author.username}/follow/')
+        post = Post.objects.create(text='Пост в ленту', author=author)
+        assert TimelineEntry.objects.filter(user=user, post=post).exists(), \
+            'Новый пост должен попадать в ленту подписчика'
+
+        response = user_client.get('/follow/')
+        assert post in response.context['page'].object_list
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_backfills_and_unfollow_prunes(self, user_client, user,
+                                                  author):
+        old = Post.objects.create(text='Старый пост', author=author)
+        user_client.get(f'/{author.username}/follow/')
+        assert TimelineEntry.objects.filter(user=user, post=old).exists(), \
+            'Подписка должна дозаполнять ленту постами автора'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert not TimelineEntry.objects.filter(user=user).exists(), \
+            'Отписка должна чистить ленту от постов автора'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_popular_author_is_read_on_demand(self, settings, user_client,
+                                              user, author):
+        settings.TIMELINE_FANOUT_LIMIT = 1
+        Follow.objects.create(user=user, author=author)
+        cache.delete(timeline.POPULAR_AUTHORS_KEY)
+
+        post = Post.objects.create(text='Пост звезды', author=author)
+        assert not TimelineEntry.objects.filter(post=post).exists(), \
+            'Посты популярных авторов не должны раскладываться по лентам'
+
+        other = get_user_model().objects.create_user(username='Other')
+        Post.objects.create(text='Чужой пост', author=other)
+        response = user_client.get('/follow/')
+        assert list(response.context['page'].object_list) == [post], \
+            'Посты популярных авторов должны подмешиваться при чтении'
+        cache.delete(timeline.POPULAR_AUTHORS_KEY)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_demoted_author_backfilled(self, settings, user_client, user,
+                                       author, django_user_model):
+        settings.TIMELINE_FANOUT_LIMIT = 2
+        other = django_user_model.objects.create_user(username='Leaving')
+        Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=other, author=author)
+        cache.delete(timeline.POPULAR_AUTHORS_KEY)
+
+        post = Post.objects.create(text='Пост звезды', author=author)
+        assert not TimelineEntry.objects.filter(post=post).exists()
+
+        Follow.objects.get(user=other).delete()
+        assert TimelineEntry.objects.filter(user=user, post=post).exists(), \
+            'Посты автора, опустившегося ниже порога, должны попасть в ленты'
+        later = Post.objects.create(text='Уже не звезда', author=author)
+        assert TimelineEntry.objects.filter(user=user, post=later).exists()
+        response = user_client.get('/follow/')
+        assert list(response.context['page'].object_list) == [later, post]
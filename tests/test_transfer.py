@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from django.core.management import call_command, CommandError
+
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserStats,
+)
+from posts.search import search_posts
+
+
+class TestTransferCommands:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_import_roundtrip(self, tmp_path, user, group,
+                                     django_user_model):
+        author = django_user_model.objects.create_user(username='Author')
+        post = Post.objects.create(text='Толстой и Чехов', author=author,
+                                   group=group)
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        Follow.objects.create(user=user, author=author)
+        pub_date = post.pub_date
+
+        path = tmp_path / 'dump.jsonl'
+        call_command('export_posts', str(path))
+        assert len(path.read_text(encoding='utf-8').splitlines()) == 4
+
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        assert not Post.objects.exists()
+
+        call_command('import_posts', str(path), batch_size=1)
+        post = Post.objects.get(text='Толстой и Чехов')
+        assert post.pub_date == pub_date, \
+            'Импорт должен сохранять даты из файла'
+        assert post.comment_count == 1
+        assert UserStats.objects.get(user=author).followers_count == 1, \
+            'После импорта счётчики должны быть пересчитаны'
+        assert TimelineEntry.objects.filter(user=user, post=post).exists(), \
+            'После импорта ленты подписок должны быть собраны'
+        assert search_posts('Чехов')[0] == [post], \
+            'После импорта поисковый индекс должен быть перестроен'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_batch_reported_and_resumable(self, tmp_path, user):
+        def line(pk, author_id):
+            return json.dumps({'model': 'posts.post', 'pk': pk, 'fields': {
+                'text': f'Пост {pk}', 'author': author_id,
+                'pub_date': '2020-01-01T00:00:00+00:00',
+                'modified': '2020-01-01T00:00:00+00:00',
+            }})
+
+        path = tmp_path / 'dump.jsonl'
+        lines = [line(1, user.pk), line(2, user.pk), line(3, 999),
+                 line(4, user.pk)]
+        path.write_text('\n'.join(lines), encoding='utf-8')
+
+        with pytest.raises(CommandError) as error:
+            call_command('import_posts', str(path), batch_size=2)
+        assert 'Строки 3–4' in str(error.value), \
+            'Ошибка должна называть строки сбойной пачки'
+        assert '--start-line 3' in str(error.value)
+        assert Post.objects.count() == 2
+        assert UserStats.objects.get(user=user).posts_count == 2, \
+            'Загруженное до ошибки должно быть досчитано'
+
+        lines[2] = line(3, user.pk)
+        path.write_text('\n'.join(lines), encoding='utf-8')
+        call_command('import_posts', str(path), batch_size=2, start_line=3)
+        assert Post.objects.count() == 4
+        assert UserStats.objects.get(user=user).posts_count == 4
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('bad_fields, message', [
+        ({'pub_date': 'вчера'}, 'Строки 3–3'),
+        ('не объект', 'Строка 3'),
+    ])
+    def test_bad_record_reported(self, tmp_path, user, bad_fields,
+                                 message):
+        def line(pk, **fields):
+            return json.dumps({'model': 'posts.post', 'pk': pk, 'fields': {
+                'text': f'Пост {pk}', 'author': user.pk,
+                'pub_date': '2020-01-01T00:00:00+00:00',
+                'modified': '2020-01-01T00:00:00+00:00', **fields,
+            }})
+
+        bad = (line(3, **bad_fields) if isinstance(bad_fields, dict)
+               else json.dumps({'model': 'posts.post', 'pk': 3,
+                                'fields': bad_fields}))
+        path = tmp_path / 'dump.jsonl'
+        path.write_text('\n'.join([line(1), line(2), bad]),
+                        encoding='utf-8')
+
+        with pytest.raises(CommandError) as error:
+            call_command('import_posts', str(path), batch_size=2)
+        assert message in str(error.value), \
+            'Ошибка должна называть строку, а не падать с трейсбеком'
+        assert '--start-line 3' in str(error.value)
+        assert UserStats.objects.get(user=user).posts_count == 2, \
+            'Загруженное до ошибки должно быть досчитано'
@@ -0,0 +1,241 @@
+"""
+Кеш в общем SQLite-файле для всех воркеров одного хоста.
+
+В отличие от LocMemCache, сброс версии ленты в одном процессе сразу
+виден остальным. Внешний сервер не нужен: файл открывается в режиме WAL,
+читатели не блокируют писателя. Число записей ограничено MAX_ENTRIES,
+при переполнении вытесняются давно не читанные ключи (LRU): лишние сверх
+MAX_ENTRIES и ещё 1/CULL_FREQUENCY записей. CULL_FREQUENCY=0, как и у
+кешей Django, очищает кеш целиком.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from . import metrics
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+'''
+
+# Время последнего чтения обновляется не чаще раза в столько секунд,
+# чтобы горячие ключи не превращали каждое чтение в запись.
+ACCESS_RESOLUTION = 10
+
+# Как часто (в записях на процесс) проверять переполнение.
+CULL_CHECK_EVERY = 100
+
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_PARAMS = 900
+
+
+def _chunks(items, size=MAX_PARAMS):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self._path, timeout=self._busy_timeout,
+                                 isolation_level=None,
+                                 check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        # Для BaseCache «backend timeout» — уже абсолютное время.
+        return self.get_backend_timeout(timeout)
+
+    def _touch_read(self, keys, now):
+        if keys:
+            marks = ','.join('?' * len(keys))
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({marks}) '
+                'AND accessed < ?',
+                [now, *keys, now - ACCESS_RESOLUTION],
+            )
+
+    def _fetch(self, keys):
+        now = time.time()
+        found = {}
+        for chunk in _chunks(keys):
+            marks = ','.join('?' * len(chunk))
+            rows = self._db.execute(
+                f'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({marks}) '
+                'AND (expires IS NULL OR expires > ?)',
+                [*chunk, now],
+            ).fetchall()
+            self._touch_read(
+                [key for key, _, accessed in rows
+                 if accessed < now - ACCESS_RESOLUTION],
+                now,
+            )
+            found.update(
+                (key, pickle.loads(value)) for key, value, _ in rows)
+        metrics.record('cache_hits', len(found))
+        metrics.record('cache_misses', len(keys) - len(found))
+        return found
+
+    def _write(self, items, timeout, replace=True):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in items
+        ]
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if replace:
+                db.executemany(
+                    'INSERT OR REPLACE INTO cache '
+                    '(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                    rows)
+                written = len(rows)
+            else:
+                # Просроченная запись не мешает add().
+                db.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (rows[0][0], now))
+                written = db.execute(
+                    'INSERT OR IGNORE INTO cache '
+                    '(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                    rows[0]).rowcount
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._maybe_cull(written)
+        return written
+
+    def _maybe_cull(self, written):
+        self._writes += written
+        if self._writes < CULL_CHECK_EVERY:
+            return
+        self._writes = 0
+        self._cull()
+
+    def _cull(self):
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if not self._cull_frequency:
+            db.execute('DELETE FROM cache')
+        else:
+            excess = (count - self._max_entries
+                      + count // self._cull_frequency)
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY accessed LIMIT ?)', (excess,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write([(key, value)], timeout, replace=False))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write([(self._key(key, version), value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        self._db.execute('DELETE FROM cache WHERE key = ?',
+                         (self._key(key, version),))
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._fetch([key])
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time(),
+                 key),
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        found = self._fetch(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            self._write(
+                [(self._key(key, version), value)
+                 for key, value in data.items()],
+                timeout,
+            )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for chunk in _chunks(keys):
+            marks = ','.join('?' * len(chunk))
+            self._db.execute(
+                f'DELETE FROM cache WHERE key IN ({marks})', chunk)
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
@@ -0,0 +1,209 @@
+"""
+Метрики запросов: Server-Timing в каждом ответе и /metrics для Prometheus.
+
+MetricsMiddleware ставит на время запроса собственный счётчик: SQL
+считается обёрткой connection.execute_wrapper, время шаблонов —
+бэкендом шаблонов TimedTemplates (указан в TEMPLATES), попадания в кеш и
+работа с миниатюрами докладываются функцией record() из кода, который их
+делает. По итогам запроса всё это уходит в заголовок Server-Timing и
+складывается в агрегаты по имени URL: гистограмму длительности и суммы
+счётчиков.
+
+Агрегаты живут в памяти процесса; при нескольких воркерах Prometheus
+собирает каждый отдельно. SQL потоковых ответов, выполненный уже после
+возврата из view, не учитывается.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.urls import Resolver404, resolve
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Имя счётчика → (имя метрики, описание). Время хранится в секундах.
+COUNTERS = {
+    'sql_queries': ('yatube_sql_queries_total', 'SQL-запросы'),
+    'sql_seconds': ('yatube_sql_seconds_total', 'Время SQL'),
+    'template_seconds': ('yatube_template_seconds_total',
+                         'Время рендера шаблонов'),
+    'cache_hits': ('yatube_cache_hits_total', 'Попадания в кеш'),
+    'cache_misses': ('yatube_cache_misses_total', 'Промахи кеша'),
+    'thumbnail_hits': ('yatube_thumbnail_hits_total',
+                       'Миниатюры, найденные готовыми'),
+    'thumbnail_queued': ('yatube_thumbnail_queued_total',
+                         'Миниатюры, поставленные в очередь'),
+    'thumbnail_seconds': ('yatube_thumbnail_seconds_total',
+                          'Время сборки миниатюр внутри запроса'),
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# {имя URL: {'buckets': [...], 'sum': с, 'count': n, счётчик: значение}}
+_aggregates = defaultdict(lambda: {
+    'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0,
+    **{name: 0 for name in COUNTERS},
+})
+
+
+def record(name, value=1):
+    """Добавляет значение к счётчику текущего запроса, если он идёт."""
+    current = getattr(_local, 'current', None)
+    if current is not None:
+        current[name] += value
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('sql_queries')
+        record('sql_seconds', time.perf_counter() - started)
+
+
+class _TimedTemplate:
+    """Шаблон бэкенда, который докладывает время своего рендера."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            record('template_seconds', time.perf_counter() - started)
+
+
+class TimedTemplates(DjangoTemplates):
+    """
+    DjangoTemplates с замером рендера шаблонов верхнего уровня. Вложенные
+    {% include %} рендерятся движком напрямую, мимо бэкенда, так что
+    время не задваивается. Без открытого запроса ничего не считает.
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Ответ мог прийти из кеша страниц, до разрешения URL.
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched'
+    return match.url_name or match.view_name or 'unnamed'
+
+
+def _observe(url_name, seconds, counters):
+    with _lock:
+        aggregate = _aggregates[url_name]
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                aggregate['buckets'][index] += 1
+        aggregate['sum'] += seconds
+        aggregate['count'] += 1
+        for name, value in counters.items():
+            aggregate[name] += value
+
+
+def _server_timing(seconds, counters):
+    return ', '.join([
+        f'sql;dur={counters["sql_seconds"] * 1000:.1f};'
+        f'desc="{counters["sql_queries"]} queries"',
+        f'tpl;dur={counters["template_seconds"] * 1000:.1f}',
+        f'cache;desc="hits={counters["cache_hits"]} '
+        f'misses={counters["cache_misses"]}"',
+        f'thumb;dur={counters["thumbnail_seconds"] * 1000:.1f};'
+        f'desc="ready={counters["thumbnail_hits"]} '
+        f'queued={counters["thumbnail_queued"]}"',
+        f'total;dur={seconds * 1000:.1f}',
+    ])
+
+
+class MetricsMiddleware:
+    """Ставится первой в MIDDLEWARE, чтобы видеть и ответы из кеша."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counters = dict.fromkeys(COUNTERS, 0)
+        _local.current = counters
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _local.current = None
+        seconds = time.perf_counter() - started
+        _observe(_url_name(request), seconds, counters)
+        response['Server-Timing'] = _server_timing(seconds, counters)
+        return response
+
+
+def _labels(url_name, **extra):
+    labels = {'view': url_name, **extra}
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('"', '\\"'))
+        for key, value in labels.items())
+
+
+def render_metrics():
+    with _lock:
+        snapshot = {
+            name: {**values, 'buckets': list(values['buckets'])}
+            for name, values in _aggregates.items()
+        }
+    lines = [
+        '# HELP yatube_request_duration_seconds Длительность запросов',
+        '# TYPE yatube_request_duration_seconds histogram',
+    ]
+    for url_name, values in sorted(snapshot.items()):
+        for bound, count in zip(BUCKETS, values['buckets']):
+            lines.append(
+                'yatube_request_duration_seconds_bucket'
+                f'{{{_labels(url_name, le=bound)}}} {count}')
+        lines += [
+            'yatube_request_duration_seconds_bucket'
+            f'{{{_labels(url_name, le="+Inf")}}} {values["count"]}',
+            'yatube_request_duration_seconds_sum'
+            f'{{{_labels(url_name)}}} {values["sum"]}',
+            'yatube_request_duration_seconds_count'
+            f'{{{_labels(url_name)}}} {values["count"]}',
+        ]
+    for name, (metric, description) in COUNTERS.items():
+        lines += [f'# HELP {metric} {description}',
+                  f'# TYPE {metric} counter']
+        lines += [
+            f'{metric}{{{_labels(url_name)}}} {values[name]}'
+            for url_name, values in sorted(snapshot.items())
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(render_metrics(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,140 @@
+"""
+Чтение с реплик и запись в основную базу.
+
+Реплики — алиасы из DATABASES, перечисленные в DATABASE_REPLICAS; для
+SQLite это копия основного файла, которую держит свежей
+`manage.py sync_replica --interval N`. Пока список пуст, роутер ничего
+не решает и всё идёт в default. Каждая синхронизация поднимает версию
+REPLICA в posts.feed_cache, которая входит в ключи кешей лент и страниц:
+иначе страница, собранная по отставшей реплике, осталась бы в кеше и
+после того, как реплика догнала основную базу.
+
+На реплики уходят только чтения моделей из REPLICA_APP_LABELS (посты,
+комментарии, подписки) и только внутри запроса. Сессии и пользователи
+читаются из основной базы: иначе только что вошедший пользователь мог бы
+оказаться анонимом. Команды и фоновые потоки тоже работают с основной
+базой — они читают то, что сами только что записали.
+
+Реплика отстаёт, поэтому пользователь, который что-то записал (пост,
+правка, комментарий, подписка), на REPLICA_PIN_SECONDS закрепляется за
+основной базой: отметка лежит в кеше, общем для всех воркеров. Закрепляют
+только записи из запросов с небезопасным методом и из адресов
+REPLICA_PIN_URL_NAMES (подписка и отписка идут через GET): попутные
+записи при чтении, вроде сборки миниатюры, читателя не закрепляют.
+Запросы с небезопасным методом и всё, что идёт после записи в том же
+запросе или внутри транзакции, тоже читают из основной базы.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+REPLICA_APP_LABELS = getattr(settings, 'REPLICA_APP_LABELS', {'posts'})
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Адреса, которые пишут данные пользователя и на GET.
+PIN_URL_NAMES = getattr(settings, 'REPLICA_PIN_URL_NAMES',
+                        {'profile_follow', 'profile_unfollow'})
+
+_state = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def _pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+
+
+def _use_primary():
+    if not getattr(_state, 'active', False):
+        return True
+    if _state.pinned or _state.wrote:
+        return True
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if (not aliases or model._meta.app_label not in REPLICA_APP_LABELS
+                or _use_primary()):
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'active', False):
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Во всех базах одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приезжает на реплики вместе с данными при синхронизации.
+        return db not in replicas()
+
+
+class PinPrimaryMiddleware:
+    """Ставится после AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _pins(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and match.url_name in PIN_URL_NAMES
+
+    def _pinned(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        user = request.user
+        return user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+        _state.active = True
+        _state.pinned = self._pinned(request)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.active = _state.pinned = _state.wrote = False
+        # После входа request.user уже вошедший пользователь.
+        if (wrote and request.user.is_authenticated
+                and self._pins(request)):
+            cache.set(_pin_key(request.user.pk), True, _pin_seconds())
+        return response
+
+
+def primary_version():
+    """
+    PRAGMA data_version основной базы. Меняется, когда базу изменило
+    другое соединение, так что по нему видно, есть ли что копировать.
+    """
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    return source.connection.execute('PRAGMA data_version').fetchone()[0]
+
+
+def sync(alias):
+    """Копирует основную базу SQLite в реплику через backup API."""
+    source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+    source.ensure_connection()
+    target.ensure_connection()
+    source.connection.backup(target.connection)
@@ -38,11 +38,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yatube.replicas.PinPrimaryMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,7 +55,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендера (yatube/metrics.py).
+        'BACKEND': 'yatube.metrics.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,9 +80,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос и переиспользуется до 10 минут.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Реплики только для чтения — алиасы из DATABASES (yatube/replicas.py).
+# Пустой список — всё идёт в default. Для SQLite реплика — копия файла,
+# которую обновляет `manage.py sync_replica --interval 5`:
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы.
+# Должно быть больше интервала синхронизации реплик.
+REPLICA_PIN_SECONDS = 15
+
+# Прагмы каждого нового соединения с SQLite поверх
+# yatube.sqlite.DEFAULT_PRAGMAS, например {'cache_size': -16 * 1024}.
+# None отключает прагму.
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,6 +162,46 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
         'default': {
-                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'BACKEND': 'yatube.cache.SQLiteCache',
+                'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+                'OPTIONS': {
+                        'MAX_ENTRIES': 100000,
+                        'CULL_FREQUENCY': 10,
+                },
         }
 }
+
+# Ленты подписок: посты авторов с числом подписчиков от этого порога
+# не раскладываются по лентам, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL_SIZE = 1000
+
+# Время жизни закешированных фрагментов лент, секунды. Записи постов
+# сбрасывают кеш сразу, поднимая версию ленты.
+FEED_CACHE_TIMEOUT = 600
+FEED_COUNT_TIMEOUT = 60
+FEED_COUNT_ESTIMATE_THRESHOLD = 100000
+
+# Целые страницы для анонимов; записи сбрасывают нужные адреса сразу.
+PAGE_CACHE_TIMEOUT = 300
+
+# Миниатюры картинок постов строятся заранее в пуле потоков.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+POST_THUMBNAIL_WORKERS = 2
+# Для srcset каждый размер собирается ещё и уже, и в WebP.
+POST_THUMBNAIL_WIDTHS = (480, 720)
+POST_THUMBNAIL_FORMATS = ('WEBP',)
+# Сколько найденных миниатюр держать в памяти каждого процесса.
+POST_THUMBNAIL_LRU_SIZE = 4096
+
+# Лимиты загружаемых картинок. Оригиналы больше POST_IMAGE_MAX_EDGE
+# по длинной стороне уменьшаются и пережимаются перед сохранением.
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_EDGE = 2048
+POST_IMAGE_QUALITY = 85
+
+# С каких адресов можно читать /metrics.
+METRICS_ALLOWED_IPS = ['127.0.0.1']
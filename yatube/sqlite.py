@@ -0,0 +1,54 @@
+"""
+Настройка каждого нового соединения с SQLite.
+
+С настройками по умолчанию SQLite ведёт журнал отката и на время записи
+блокирует весь файл: запись поста или комментария останавливает читателей,
+а под нагрузкой запросы падают с «database is locked». Обработчик
+connection_created включает WAL (читатели не ждут писателя и наоборот),
+synchronous=NORMAL (в WAL это всё ещё устойчиво к падению процесса),
+ожидание занятой базы вместо ошибки, mmap и кеш страниц побольше и
+временные таблицы в памяти.
+
+Значения — DEFAULT_PRAGMAS, поверх которых накладывается SQLITE_PRAGMAS
+из настроек; None отключает прагму. Сами соединения живут дольше
+запроса благодаря CONN_MAX_AGE, так что всё это выполняется редко.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Миллисекунды.
+    'busy_timeout': 5000,
+    # Байты.
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — в КиБ, то есть 64 МиБ.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def pragmas():
+    return {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+
+
+def apply_pragmas(db, values):
+    """Выполняет PRAGMA на соединении sqlite3 (не обёртке Django)."""
+    for name, value in values.items():
+        if value is None:
+            continue
+        if not name.isidentifier():
+            raise ImproperlyConfigured(f'Неверное имя прагмы SQLite: {name}')
+        db.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        # Напрямую, мимо курсора Django: это не запросы приложения, и
+        # они не должны попадать в метрики и счётчики запросов.
+        apply_pragmas(connection.connection, pragmas())
@@ -7,12 +7,16 @@ from django.conf.urls import handler404, handler500
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import metrics_view
+
 
 handler404 = 'posts.views.page_not_found' # noqa
 handler500 = 'posts.views.server_error' # noqa
 
 
 urlpatterns = [
+    path('metrics', metrics_view, name='metrics'),
+    path('api/', include('posts.api_urls')),
     path('', include('posts.urls')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),